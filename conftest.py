@@ -0,0 +1,2 @@
+# Lets the tests in tests/ import workflow_optimizer from this checkout:
+# pytest puts the directory of a rootdir conftest.py on sys.path.
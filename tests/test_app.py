@@ -0,0 +1,55 @@
+"""Tests for the Streamlit UI, run with AppTest (skipped without streamlit)."""
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.elements.progress import ProgressMixin  # noqa: E402
+from streamlit.runtime.scriptrunner_utils.exceptions import StopException  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from workflow_optimizer.metrics import METRICS  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def analyze(app, text):
+    app.text_area[0].set_value(text).run()
+    next(button for button in app.button if button.label.startswith("🔍")).click().run()
+
+
+def outcomes():
+    return {labels[0][1]: histogram.count for (name, labels), histogram in METRICS.histograms.items()
+            if name == "workflow_request_seconds"}
+
+
+def test_request_outcomes(monkeypatch):
+    METRICS.enable()
+    with METRICS.lock:
+        saved = METRICS.counters, METRICS.histograms
+        METRICS.counters, METRICS.histograms = {}, {}
+    try:
+        app = AppTest.from_file(APP, default_timeout=60).run()
+        analyze(app, "I enter invoices into excel every day")
+        assert not app.exception
+        assert any("Automation Opportunities" in element.value for element in app.markdown)
+        assert outcomes() == {"ok": 1}
+
+        # Streamlit stops a run for a Cancel click by raising StopException
+        # or RerunException from the next Streamlit call
+        original = ProgressMixin.progress
+        calls = []
+
+        def interrupted(self, value, *args, **kwargs):
+            calls.append(value)
+            if len(calls) > 1:
+                raise StopException()
+            return original(self, value, *args, **kwargs)
+
+        monkeypatch.setattr(ProgressMixin, "progress", interrupted)
+        analyze(app, "I scan paperwork into folders every week")
+        assert outcomes() == {"ok": 1, "cancelled": 1}
+    finally:
+        METRICS.disable()
+        with METRICS.lock:
+            METRICS.counters, METRICS.histograms = saved
@@ -0,0 +1,113 @@
+"""MicroBatchScheduler with the offline stub backend."""
+import threading
+import time
+
+import pytest
+
+from workflow_optimizer.backends import MicroBatchScheduler, StubBackend, measure_batching
+from workflow_optimizer.engine import AnalysisCancelled, generate_response
+
+
+class ScriptStopped(BaseException):
+    """Like Streamlit's StopException, which derives from BaseException"""
+
+
+class ModelLikeBackend(StubBackend):
+    """A stub that drops its weights on unload, like LocalModelBackend"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.weights = None
+
+    def load(self):
+        super().load()
+        self.weights = "weights"
+
+    def unload(self):
+        self.weights = None
+        super().unload()
+
+    def generate_batch(self, requests):
+        results = super().generate_batch(requests)
+        if self.weights is None:
+            raise TypeError("model unloaded during the batch")
+        return results
+
+
+def test_batching_raises_throughput_under_concurrent_load():
+    backend = StubBackend(batch_latency=0.02, item_latency=0.001)
+    backend.load()
+    single = measure_batching(backend, requests=64, concurrency=16, max_batch_size=1)
+    batched = measure_batching(backend, requests=64, concurrency=16, max_batch_size=8)
+    assert single["matches_engine"] and batched["matches_engine"]
+    assert batched["mean_batch"] > 2
+    assert batched["requests_per_sec"] > 2 * single["requests_per_sec"]
+
+
+def test_reload_waits_for_the_batch_in_flight():
+    backend = ModelLikeBackend(batch_latency=0.05, load_latency=0.05)
+    backend.load()
+    scheduler = MicroBatchScheduler(backend, max_batch_size=4)
+    try:
+        results = []
+        senders = [
+            threading.Thread(target=lambda index=index: results.append(scheduler.generate(f"daily report {index}")))
+            for index in range(12)
+        ]
+        for sender in senders:
+            sender.start()
+        time.sleep(0.02)  # a batch is running now
+        scheduler.reload()
+        for sender in senders:
+            sender.join()
+        assert sorted(map(str, results)) == sorted(str(generate_response(f"daily report {index}")) for index in range(12))
+    finally:
+        scheduler.close()
+
+
+def test_progress_is_reported_while_waiting():
+    backend = StubBackend(batch_latency=0.3)
+    backend.load()
+    scheduler = MicroBatchScheduler(backend)
+    labels = []
+    try:
+        scheduler.generate("weekly spreadsheet update", progress=lambda done, total, label: labels.append(label))
+    finally:
+        scheduler.close()
+    waiting = [label for label in labels if label.startswith("Waiting")]
+    assert len(waiting) >= 4
+    assert labels[-1] == "Done"
+
+
+def test_interrupted_wait_drops_the_request():
+    backend = StubBackend(batch_latency=0.2)
+    backend.load()
+    scheduler = MicroBatchScheduler(backend, max_batch_size=1)
+    try:
+        busy = scheduler.submit("first request")  # keeps the worker busy
+
+        def stop(done, total, label):
+            if "s)" in label:
+                raise ScriptStopped()
+
+        with pytest.raises(ScriptStopped):
+            scheduler.generate("second request", progress=stop)
+        busy.result()
+    finally:
+        scheduler.close()
+    assert scheduler.items == 1
+
+
+def test_cancel_abandons_the_wait():
+    backend = StubBackend(batch_latency=0.5)
+    backend.load()
+    scheduler = MicroBatchScheduler(backend)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    try:
+        start = time.perf_counter()
+        with pytest.raises(AnalysisCancelled):
+            scheduler.generate("monthly invoices", cancel=cancel)
+        assert time.perf_counter() - start < 0.4
+    finally:
+        scheduler.close()
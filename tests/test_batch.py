@@ -0,0 +1,82 @@
+"""Tests for the bulk analysis CLI and run_batch."""
+import csv
+import json
+
+import pytest
+
+from workflow_optimizer.batch import FEATURE_FIELDS, main, run_batch
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.dedup import NearDuplicateIndex
+from workflow_optimizer.engine import extract_features, generate_response
+
+RECORDS = [{"id": f"r{index}", "text": item["text"]} for index, item in enumerate(build_corpus(40, seed=9))]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_results_in_input_order(executor):
+    rows = []
+    count = run_batch(iter(RECORDS), rows.append, id_field="id", creativity_level=0.4, response_length=150,
+                      workers=3, executor=executor, chunk_size=3, max_in_flight=2)
+    assert count == len(RECORDS)
+    assert [row["id"] for row in rows] == [record["id"] for record in RECORDS]
+    for record, row in zip(RECORDS, rows):
+        assert {name: value for name, value in row.items() if name != "id"} == generate_response(record["text"], 0.4, 150)
+
+
+def test_features_only():
+    rows = []
+    run_batch(RECORDS[:10], rows.append, executor="thread", chunk_size=4, features=True)
+    for record, row in zip(RECORDS, rows):
+        features = extract_features(record["text"])
+        assert row == {field: features[field] for field in FEATURE_FIELDS}
+
+
+def test_duplicate_labels():
+    template = "I copy invoice totals from email into an excel spreadsheet every day and it takes {} hours"
+    records = [{"id": "a", "text": template.format(1)}, {"id": "b", "text": "We hire people"},
+               {"id": "c", "text": template.format(2)}, {"id": "d", "text": None}]
+    rows = []
+    run_batch(records, rows.append, id_field="id", executor="thread", chunk_size=2,
+              near_duplicates=NearDuplicateIndex(0.8))
+    assert [row["duplicate_of"] for row in rows] == [None, None, "a", None]
+    rows = []
+    run_batch(records, rows.append, executor="thread", near_duplicates=NearDuplicateIndex(0.8))
+    assert [row["duplicate_of"] for row in rows] == [None, None, 0, None]
+
+
+def test_non_string_text_is_an_error():
+    with pytest.raises(ValueError, match="record 2: text must be a string"):
+        run_batch([{"text": "fine"}, {"text": 5}], lambda row: None, executor="thread")
+
+
+def test_cli_csv_in_and_out(tmp_path):
+    source = tmp_path / "in.csv"
+    with open(source, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "body"])
+        writer.writeheader()
+        writer.writerows({"id": record["id"], "body": record["text"]} for record in RECORDS[:8])
+    output = tmp_path / "out.csv"
+    main([str(source), "-o", str(output), "--text-field", "body", "--id-field", "id", "--features",
+          "--executor", "thread", "--chunk-size", "3"])
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["id"] for row in rows] == [record["id"] for record in RECORDS[:8]]
+    for record, row in zip(RECORDS, rows):
+        features = extract_features(record["text"])
+        assert json.loads(row["workflow_scores"]) == features["workflow_scores"]
+        assert json.loads(row["tools"]) == features["tools"]
+        assert json.loads(row["pain_points"]) == features["pain_points"]
+        assert row["primary_workflow"] == features["primary_workflow"]
+
+
+def test_cli_jsonl_errors(tmp_path, capsys):
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"text": "I enter invoices"}\n\n{"text": 5}\n', encoding="utf-8")
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(source), "--executor", "thread"])
+    assert exit_info.value.code == 1
+    assert "text must be a string" in capsys.readouterr().err
+    source.write_text('{"text": "ok"}\n[1, 2]\n', encoding="utf-8")
+    with pytest.raises(SystemExit):
+        main([str(source), "--executor", "thread"])
+    assert "line 2: expected a JSON object" in capsys.readouterr().err
@@ -0,0 +1,68 @@
+"""Tests for the benchmark comparison gate and its portability."""
+import os
+import subprocess
+import sys
+
+from workflow_optimizer import bench
+from workflow_optimizer.bench import compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(p50=100.0, p99=200.0, count=300, rate=1000.0, calibration=None):
+    results = {
+        "import_ms": 50.0,
+        "latency": {
+            "generate_response": {"count": count, "p50_us": p50, "p95_us": p99, "p99_us": p99},
+            "stages": {"fun": {"count": 4, "p50_us": p50}},
+        },
+        "instrumentation": {"enabled_overhead_us": 1.0},
+        "throughput": {"threadx1": rate},
+    }
+    if calibration:
+        results["calibration_us"] = {"latency": calibration, "throughput": calibration}
+    return results
+
+
+def test_same_run_has_no_regressions():
+    assert compare(run(), run()) == []
+
+
+def test_slower_median_and_lower_throughput_regress():
+    names = [name for name, _, _, _ in compare(run(), run(p50=150.0, rate=700.0))]
+    assert names == ["latency.generate_response.p50_us", "throughput.threadx1"]
+
+
+def test_tails_small_groups_and_single_measurements_are_not_gated():
+    current = run(p99=1000.0)
+    current["latency"]["stages"]["fun"]["p50_us"] = 1000.0
+    current["import_ms"] = 500.0
+    current["instrumentation"]["enabled_overhead_us"] = 50.0
+    assert compare(run(), current) == []
+
+
+def test_medians_need_min_samples_in_both_runs():
+    assert compare(run(count=20), run(count=20, p50=150.0)) == []
+    assert compare(run(count=20), run(count=20, p50=150.0), min_samples=10)
+
+
+def test_calibration_scales_to_the_baseline_machine():
+    # Everything, including the calibration workload, ran 1.5x slower
+    assert compare(run(calibration=5000.0), run(p50=150.0, rate=667.0, calibration=7500.0)) == []
+    # Only the code got slower
+    regressions = compare(run(calibration=5000.0), run(p50=150.0, calibration=5000.0))
+    assert [name for name, _, _, _ in regressions] == ["latency.generate_response.p50_us"]
+
+
+def test_imports_without_the_resource_module():
+    # resource is POSIX only; a None entry in sys.modules makes importing it fail
+    code = ("import sys; sys.modules['resource'] = None; "
+            "from workflow_optimizer.bench import build_corpus, measure_memory; "
+            "print(measure_memory(build_corpus(3))['max_rss_kib'])")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "None"
+
+
+def test_memory_is_measured():
+    memory = bench.measure_memory(bench.build_corpus(3))
+    assert memory["traced_peak_kib"] > 0
@@ -0,0 +1,117 @@
+"""Tests for ResultCache and its near-duplicate lookups."""
+import threading
+
+import pytest
+
+from workflow_optimizer.cache import ResultCache
+from workflow_optimizer.dedup import NearDuplicateIndex
+from workflow_optimizer.engine import AnalysisCancelled, generate_response
+
+# Numbers are left out of signatures, so these are near-duplicates of each other
+TEMPLATE = "I copy invoice totals from email into an excel spreadsheet every day and it takes {} hours"
+
+
+def near_cache():
+    return ResultCache(near_duplicates=NearDuplicateIndex(0.8))
+
+
+def test_exact_hits_and_misses():
+    cache = ResultCache()
+    text = TEMPLATE.format(2)
+    assert cache.analyze(text) == generate_response(text)
+    assert cache.analyze("  " + text.replace(" ", "\n")) == generate_response(text)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_near_duplicate_reuses_result():
+    cache = near_cache()
+    first = cache.analyze(TEMPLATE.format(2))
+    assert cache.analyze(TEMPLATE.format(3)) == first
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_cancelled_first_request_does_not_block_near_hits():
+    cache = near_cache()
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(AnalysisCancelled):
+        list(cache.stream(TEMPLATE.format(1), cancel=cancel))
+    second = list(cache.stream(TEMPLATE.format(2)))
+    assert list(cache.stream(TEMPLATE.format(3))) == second
+    stats = cache.stats()
+    assert (stats["near_hits"], stats["misses"]) == (1, 2)
+
+
+def test_near_duplicates_with_other_settings():
+    cache = near_cache()
+    cache.analyze(TEMPLATE.format(1), 0.7)
+    second = cache.analyze(TEMPLATE.format(2), 0.5)
+    assert second == generate_response(TEMPLATE.format(2), 0.5)
+    assert cache.analyze(TEMPLATE.format(3), 0.5) == second
+    assert cache.analyze(TEMPLATE.format(4), 0.5) == second
+    stats = cache.stats()
+    assert (stats["near_hits"], stats["misses"]) == (2, 2)
+
+
+def test_disk_store_is_shared(tmp_path):
+    path = str(tmp_path / "results.db")
+    text = TEMPLATE.format(2)
+    first = ResultCache(path=path)
+    try:
+        result = first.analyze(text)
+    finally:
+        first.close()
+    second = ResultCache(path=path)
+    try:
+        assert second.analyze(text) == result
+        assert second.stats()["disk_hits"] == 1
+    finally:
+        second.close()
+
+
+def result(index, size=10):
+    return {"automation": f"{index:0{size}d}", "efficiency": "", "fun": ""}
+
+
+def test_max_entries_evicts_oldest_first():
+    cache = ResultCache(max_entries=3)
+    for index in range(3):
+        cache.put(f"k{index}", result(index))
+    assert cache.get("k0") is not None  # now the most recently used
+    cache.put("k3", result(3))
+    assert cache.get("k1") is None
+    assert [cache.get(key) is not None for key in ("k0", "k2", "k3")] == [True, True, True]
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (3, 1)
+
+
+def test_max_bytes_evicts_oldest_first():
+    cache = ResultCache(max_bytes=300)
+    for index in range(5):
+        cache.put(f"k{index}", result(index, 100))
+    stats = cache.stats()
+    assert stats["bytes"] <= 300 and stats["entries"] == 2 and stats["evictions"] == 3
+    assert cache.get("k3") is not None and cache.get("k4") is not None and cache.get("k2") is None
+    # A result larger than the whole budget is not kept
+    cache.put("big", result(0, 1000))
+    assert cache.get("big") is None and cache.stats()["bytes"] == 0
+
+
+def test_disk_store_keeps_the_newest_rows(tmp_path):
+    path = str(tmp_path / "results.db")
+    cache = ResultCache(max_entries=1, path=path, max_disk_entries=200)
+    try:
+        for index in range(450):
+            cache.put(f"k{index}", result(index))
+        rows = cache.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        assert 200 <= rows < 200 + 200 // 100 + 1
+        assert cache.get("k449") is not None and cache.get("k0") is None
+    finally:
+        cache.close()
+    reopened = ResultCache(path=path, max_disk_entries=50)
+    try:
+        assert reopened.db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 50
+        assert reopened.get("k449") is not None and reopened.get("k399") is None
+    finally:
+        reopened.close()
@@ -0,0 +1,145 @@
+"""Tests for loading, validating and hot-reloading the suggestion catalog."""
+import copy
+import hashlib
+import json
+import os
+import pickle
+
+import pytest
+
+from workflow_optimizer import catalog
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.catalog import CATALOG_PATH, CatalogError, current_catalog, load_catalog, reload_catalog, validate
+from workflow_optimizer.engine import generate_response
+
+with open(CATALOG_PATH, encoding="utf-8") as f:
+    SHIPPED = json.load(f)
+
+# SHA-256 of the JSON of generate_response for build_corpus(300, seed=77),
+# recorded from the engine before the tables moved into catalog.json
+GOLDEN = {
+    (0.7, None): "5f0c2f75f768846e2961acfd620e05bbba4e771f261fdd39e5aebe83d6b36b71",
+    (0.3, 120): "2886420ecb2ef4551ff4793d6688939470115a11176b03602bf953a8ff10c9d2",
+    (1.0, 500): "d1dfc9b932a8bc2575935ecb39738a2bb676caa7a4fa7f9023407fd331476bf5",
+}
+
+
+def changed(path, value):
+    """A copy of the shipped catalog with the item at path (a tuple of keys) set to value"""
+    data = copy.deepcopy(SHIPPED)
+    target = data
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+    return data
+
+
+def suggestion(template="Use {}", choices=(("tools",),)):
+    return {"template": template, "choices": [list(options) for options in choices]}
+
+
+MALFORMED = {
+    "not an object": [],
+    "other version": changed(("version",), 2),
+    "keyword table not an object": changed(("tools",), []),
+    "keywords not a list": changed(("tools", "microsoft"), "excel"),
+    "empty keyword": changed(("tools", "microsoft"), ["excel", " "]),
+    "section a list": changed(("automation",), []),
+    "section a string": changed(("fun",), "x"),
+    "section missing": {key: value for key, value in SHIPPED.items() if key != "efficiency"},
+    "table not an object": changed(("automation", "tool"), []),
+    "unknown part": changed(("automation", "pains"), {}),
+    "unknown fun part": changed(("fun", "generic"), [suggestion()]),
+    "unknown top-level table": changed(("pain_indicator",), {"manual": ["copy"]}),
+    "suggestion list not a list": changed(("automation", "workflow", "general"), suggestion()),
+    "suggestion not an object": changed(("automation", "tool", "microsoft"), "Use macros"),
+    "named placeholder": changed(("automation", "tool", "microsoft"), suggestion("Use {tool}")),
+    "broken template": changed(("automation", "tool", "microsoft"), suggestion("Use {")),
+    "placeholder count": changed(("automation", "tool", "microsoft"), suggestion("Use {} and {}")),
+    "unknown category": changed(("automation", "tool", "lotus"), suggestion()),
+    "general missing": changed(("efficiency", "workflow"), {"reporting": [suggestion()]}),
+    "fun general a string": changed(("fun", "general"), "have fun"),
+}
+
+
+def test_shipped_catalog_is_valid():
+    validate(SHIPPED)
+    assert load_catalog(CATALOG_PATH, use_snapshot=False).tools["microsoft"][0] == "excel"
+
+
+@pytest.mark.parametrize("settings", list(GOLDEN))
+def test_outputs_match_the_engine_before_the_catalog(settings):
+    texts = [item["text"] for item in build_corpus(300, seed=77)]
+    outputs = [generate_response(text, *settings) for text in texts]
+    assert hashlib.sha256(json.dumps(outputs, sort_keys=True).encode()).hexdigest() == GOLDEN[settings]
+
+
+@pytest.mark.parametrize("name", list(MALFORMED))
+def test_malformed_catalogs_are_rejected(name, tmp_path):
+    with pytest.raises(CatalogError):
+        validate(MALFORMED[name])
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(MALFORMED[name]), encoding="utf-8")
+    with pytest.raises(CatalogError):
+        load_catalog(str(path))
+
+
+def test_invalid_json_is_rejected(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text('{"version": 1,', encoding="utf-8")
+    with pytest.raises(CatalogError):
+        load_catalog(str(path))
+
+
+def test_hot_reload_keeps_the_previous_catalog(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(SHIPPED), encoding="utf-8")
+    monkeypatch.setattr(catalog, "RELOAD_INTERVAL", 1e-9)
+    text = "I copy excel reports into email every day"
+    try:
+        loaded = reload_catalog(str(path))
+        expected = generate_response(text)
+        for name in ["section a list", "section a string", "named placeholder"]:
+            path.write_text(json.dumps(MALFORMED[name]) + " " * len(name), encoding="utf-8")
+            with pytest.warns(RuntimeWarning, match="keeping the previous catalog"):
+                assert generate_response(text) == expected
+            assert current_catalog() is loaded
+
+        # A fixed file is picked up again
+        data = changed(("tools", "microsoft"), SHIPPED["tools"]["microsoft"] + ["ledger"])
+        path.write_text(json.dumps(data), encoding="utf-8")
+        os.utime(path, ns=(0, 0))
+        assert "ledger" in current_catalog().tools["microsoft"]
+    finally:
+        reload_catalog(CATALOG_PATH)
+
+
+class Exploit:
+    """Creates the file at marker when unpickled"""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return (open, (self.marker, "w"))
+
+
+def test_snapshot_round_trips_and_never_unpickles(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(SHIPPED), encoding="utf-8")
+    fresh = load_catalog(str(path))
+    snapshot = catalog.snapshot_path(str(path))
+    stamp = catalog.file_stamp(str(path))
+    assert catalog.read_snapshot(str(path), stamp) == catalog.compile_tables(SHIPPED)
+    assert load_catalog(str(path)).pain_fun == fresh.pain_fun
+
+    # A stale stamp is ignored
+    assert catalog.read_snapshot(str(path), (0, 0)) is None
+
+    # A pickle planted in its place is not loaded, so its code does not run
+    marker = tmp_path / "exploited"
+    with open(snapshot, "wb") as f:
+        pickle.dump((os.path.abspath(path), stamp, Exploit(str(marker))), f)
+    assert catalog.read_snapshot(str(path), stamp) is None
+    assert load_catalog(str(path)).pain_fun == fresh.pain_fun
+    assert not marker.exists()
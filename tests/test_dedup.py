@@ -0,0 +1,99 @@
+"""Tests for MinHash signatures and the NearDuplicateIndex."""
+import random
+import string
+
+from workflow_optimizer.dedup import NearDuplicateIndex, choose_bands, signature, similarity
+
+
+def random_words(rng, count):
+    return [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        for _ in range(count)
+    ]
+
+
+def reworded(words, rng, changes):
+    """A copy of words with changes positions replaced by new words"""
+    words = list(words)
+    for position in rng.sample(range(len(words)), changes):
+        words[position] = random_words(rng, 1)[0]
+    return words
+
+
+def jaccard(first, second):
+    first, second = set(zip(first, first[1:])), set(zip(second, second[1:]))
+    return len(first & second) / len(first | second)
+
+
+def test_bands_favour_recall():
+    assert choose_bands(0.8, 64) == (16, 4)
+    for threshold in (0.5, 0.6, 0.7, 0.8, 0.9):
+        bands, rows = choose_bands(threshold, 64)
+        assert bands * rows == 64
+        assert 1 - (1 - threshold ** rows) ** bands >= 0.95
+
+
+def test_recall_on_reworded_texts():
+    rng = random.Random(11)
+    for threshold, changes in ((0.8, 6), (0.8, 10), (0.6, 20)):
+        index = NearDuplicateIndex(threshold)
+        originals = [random_words(rng, 200) for _ in range(60)]
+        for key, words in enumerate(originals):
+            index.add(key, " ".join(words))
+        expected = found = 0
+        for key, words in enumerate(originals):
+            variant = reworded(words, rng, changes)
+            assert jaccard(words, variant) < 1
+            text = " ".join(variant)
+            # What comparing against every stored signature would find
+            if similarity(signature(text), signature(" ".join(words))) >= threshold:
+                expected += 1
+                match = index.query(text)
+                found += match is not None and match[0] == key
+        assert expected >= 30
+        assert found >= 0.95 * expected, (threshold, changes, found, expected)
+
+
+def test_unrelated_texts_are_not_matched():
+    rng = random.Random(12)
+    index = NearDuplicateIndex(0.6)
+    for key in range(50):
+        index.add(key, " ".join(random_words(rng, 100)))
+    assert all(index.query(" ".join(random_words(rng, 100))) is None for _ in range(50))
+
+
+def test_capacity_drops_the_oldest():
+    rng = random.Random(13)
+    texts = [" ".join(random_words(rng, 50)) for _ in range(5)]
+    index = NearDuplicateIndex(0.8, capacity=3)
+    for key, text in enumerate(texts):
+        index.add(key, text)
+    assert len(index) == 3
+    assert [index.query(text) for text in texts[:2]] == [None, None]
+    assert [index.query(text)[0] for text in texts[2:]] == [2, 3, 4]
+    # Evicted keys are gone from every bucket too
+    for bucket in index.buckets:
+        for keys in bucket.values():
+            assert set(keys if isinstance(keys, list) else [keys]) <= {2, 3, 4}
+
+
+def test_max_bucket_bounds_each_bucket():
+    text = "the same description submitted again and again"
+    index = NearDuplicateIndex(0.8, max_bucket=4)
+    for key in range(10):
+        index.add(key, text)
+    for bucket in index.buckets:
+        for keys in bucket.values():
+            assert len(keys if isinstance(keys, list) else [keys]) <= 4
+    assert index.query(text)[0] in {6, 7, 8, 9}
+
+
+def test_candidates_are_closest_first():
+    rng = random.Random(14)
+    words = random_words(rng, 200)
+    index = NearDuplicateIndex(0.5)
+    index.add("far", " ".join(reworded(words, rng, 25)))
+    index.add("near", " ".join(reworded(words, rng, 3)))
+    matches = index.candidates(" ".join(words))
+    assert [key for key, _ in matches] == ["near", "far"]
+    assert matches[0][1] >= matches[1][1] >= 0.5
@@ -0,0 +1,28 @@
+"""Tests that the engine is deterministic, thread-safe and leaves the global RNG alone."""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.engine import generate_response
+
+TEXTS = [item["text"] for item in build_corpus(120, seed=3)]
+SETTINGS = [(0.7, None), (0.2, 100), (1.0, 400)]
+
+
+def test_concurrent_calls_match_sequential_ones():
+    jobs = [(text, creativity, length) for text in TEXTS for creativity, length in SETTINGS]
+    expected = [generate_response(*job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(lambda job: generate_response(*job), jobs)) == expected
+
+
+def test_global_random_state_is_untouched():
+    random.seed(42)
+    state = random.getstate()
+    for text in TEXTS[:10]:
+        generate_response(text)
+    assert random.getstate() == state
+
+
+def test_same_input_same_output():
+    assert generate_response(TEXTS[0], 0.4, 200) == generate_response(TEXTS[0], 0.4, 200)
@@ -0,0 +1,90 @@
+"""Tests that IncrementalFeatures matches a cold extract_features after every edit."""
+import json
+import random
+
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.catalog import CATALOG_PATH, reload_catalog
+from workflow_optimizer.engine import extract_features
+from workflow_optimizer.incremental import IncrementalFeatures, SegmentCache
+
+TEXTS = [item["text"] for item in build_corpus(40, seed=31)]
+# Pieces that create or join keywords and sentences when pasted mid-text
+PIECES = [". ", ".", " ", "every day", "takes forever", "excel", "1200", "45", "report. ", "time-consuming", "\n"]
+
+
+def edit(text, rng):
+    """Apply one random edit: typing, deleting a span, pasting, replacing or repeating a sentence"""
+    kind = rng.randrange(5)
+    position = rng.randint(0, len(text))
+    if kind == 0:
+        return text[:position] + rng.choice(PIECES) + text[position:]
+    if kind == 1:
+        return text[:position] + text[position + rng.randint(1, 12):]
+    if kind == 2:
+        return text[:position] + rng.choice(rng.choice(TEXTS).split(". ")) + text[position:]
+    sentences = text.split(". ")
+    index = rng.randrange(len(sentences))
+    if kind == 3:
+        sentences[index] = rng.choice(rng.choice(TEXTS).split(". "))
+    elif rng.random() < 0.5 or len(sentences) == 1:
+        sentences.insert(index, sentences[index])
+    else:
+        del sentences[index]
+    return ". ".join(sentences)
+
+
+def test_random_edits_match_cold_extraction():
+    rng = random.Random(2024)
+    cache = SegmentCache()
+    for text in TEXTS[:20]:
+        editor = IncrementalFeatures(cache)
+        for _ in range(25):
+            assert editor.extract_features(text) == extract_features(text)
+            text = edit(text, rng)
+    assert cache.stats()["hits"] > 0
+
+
+def test_small_cache_and_shared_editors():
+    rng = random.Random(7)
+    cache = SegmentCache(max_segments=3)
+    editors = [IncrementalFeatures(cache) for _ in range(3)]
+    texts = TEXTS[:3]
+    for _ in range(60):
+        index = rng.randrange(len(editors))
+        texts[index] = edit(texts[index], rng)
+        assert editors[index].extract_features(texts[index]) == extract_features(texts[index])
+    assert cache.stats()["segments"] <= 3
+
+
+def test_repeated_sentences():
+    # The unchanged beginning and end overlap when a sentence is repeated
+    a, b = "I check email daily", "the excel report takes hours"
+    editor = IncrementalFeatures()
+    for sentences in [[a, a], [a, a, a], [a, b, a], [a, a], [a], [a, a, b, a, a], [a, b, a, a], [b]]:
+        text = ". ".join(sentences)
+        assert editor.extract_features(text) == extract_features(text)
+
+
+def test_whole_text_replaced_and_cleared():
+    editor = IncrementalFeatures()
+    for text in [TEXTS[0], TEXTS[1], "", TEXTS[1], TEXTS[1] + ". " + TEXTS[2], ". . ."]:
+        assert editor.extract_features(text) == extract_features(text)
+
+
+def test_catalog_reload_rematches(tmp_path):
+    text = "I fill in the ledger by hand. Then I email the ledger"
+    editor = IncrementalFeatures()
+    before = editor.extract_features(text)
+    with open(CATALOG_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    data["tools"]["microsoft"].append("ledger")
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    try:
+        reload_catalog(str(path))
+        after = editor.extract_features(text)
+        assert after == extract_features(text)
+        assert "microsoft" in after["tools"] and "microsoft" not in before["tools"]
+    finally:
+        reload_catalog(CATALOG_PATH)
+    assert editor.extract_features(text) == before
@@ -0,0 +1,71 @@
+"""Tests that chunked document ingest matches extract_features on the whole text."""
+import io
+
+import pytest
+
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.engine import AnalysisCancelled, extract_features, generate_response
+from workflow_optimizer.ingest import DocumentFeatures, extract_document_features, stream_document
+
+TEXTS = [item["text"] for item in build_corpus(30, seed=41)]
+# Multi-word and hyphenated keywords, numbers and multi-byte characters to cut through
+TRICKY = [
+    "it takes forever every day, every\nday and  every \t day",
+    "so time-consuming, time - consuming and time -\nconsuming",
+    # Each of these is the only keyword of its category in the text
+    "the manual process is time - consuming",
+    "the job takes\n\nforever",
+    "café naïve résumé ✅ 📊 report 12 and 999 but not 1000 or 123456",
+    "",
+    "   ",
+    "\n".join(TEXTS[:5]),
+    "\r\n\r\n".join(TEXTS[5:15]) + " takes",
+]
+CHUNK_SIZES = [1, 2, 3, 7, 37, 256, 1024 * 1024]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_chunked_ingest_matches_extract_features(chunk_size):
+    for text in TEXTS + TRICKY:
+        stream = io.BytesIO(text.encode("utf-8"))
+        assert extract_document_features(stream, chunk_size=chunk_size) == extract_features(text)
+
+
+def test_text_streams_and_single_feeds():
+    text = TRICKY[7]
+    assert extract_document_features(io.StringIO(text), chunk_size=5) == extract_features(text)
+    document = DocumentFeatures()
+    document.feed(text)
+    document.close()
+    assert document.features() == extract_features(text)
+
+
+def test_stream_document_matches_generate_response():
+    text = TRICKY[8]
+    suggestions = {}
+    for section, suggestion in stream_document(io.BytesIO(text.encode()), 0.3, 120, chunk_size=64):
+        suggestions.setdefault(section, []).append(suggestion)
+    expected = generate_response(text, 0.3, 120)
+    assert {section: "\n".join(lines) for section, lines in suggestions.items()} == {
+        section: value for section, value in expected.items() if value
+    }
+
+
+def test_progress_and_cancel():
+    text = "\n".join(TEXTS).encode()
+    reports = []
+    extract_document_features(io.BytesIO(text), size=len(text), progress=lambda *args: reports.append(args),
+                              chunk_size=1024)
+    fractions = [done for done, _, label in reports if label.startswith("Reading")]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+
+    class CancelAfterFirstChunk:
+        def __init__(self):
+            self.calls = 0
+
+        def is_set(self):
+            self.calls += 1
+            return self.calls > 2  # the check at stage 0, then the first chunk
+
+    with pytest.raises(AnalysisCancelled):
+        extract_document_features(io.BytesIO(text), cancel=CancelAfterFirstChunk(), chunk_size=1024)
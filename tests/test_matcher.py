@@ -0,0 +1,61 @@
+"""Tests for KeywordMatcher's word, inflection, acronym and phrase matching."""
+import pytest
+
+from workflow_optimizer.catalog import current_catalog
+from workflow_optimizer.matcher import KeywordMatcher
+
+TABLES = {
+    "workflow_types": {
+        "reporting": ["report"],
+        "document_management": ["scan"],
+        "inventory": ["supply"],
+        "data_entry": ["form", "manual entry"],
+        "hr_process": ["hr"],
+        "technical_support": ["IT"],
+    },
+    "pain_indicators": {"time_consuming": ["time-consuming", "takes forever"]},
+}
+
+
+def keywords(text, matcher=None):
+    entries, _ = (matcher or KeywordMatcher(TABLES)).match(text)
+    return {keyword for _, _, keyword in entries}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("IT keeps the laptops running", {"IT"}),
+    ("it keeps the laptops running", set()),
+    ("It is slow", set()),
+    ("three people", set()),
+    ("HR onboarding", {"hr"}),
+    ("ask hr", {"hr"}),
+    ("information about the forms", {"form"}),
+    ("information platform formal", set()),
+    ("weekly reports", {"report"}),
+    ("reporting and reported", {"report"}),
+    ("I scanned and scanning", {"scan"}),
+    ("office supplies", {"supply"}),
+    ("manual entries every day", {"manual entry"}),
+    ("manual  entry", {"manual entry"}),
+    ("very time-consuming", {"time-consuming"}),
+    ("time consuming and time - consuming", {"time-consuming"}),
+    ("overtime-consuming", set()),
+    ("it takes forever", {"takes forever"}),
+    ("takes foreverything", set()),
+])
+def test_keyword_matching(text, expected):
+    assert keywords(text) == expected
+
+
+def test_numbers_are_collected_per_token():
+    _, numbers = KeywordMatcher(TABLES).match("12 forms, 3 reports and 12 more 4x5")
+    assert sorted(numbers) == ["12", "12", "3", "4", "5"]
+
+
+def test_shipped_catalog():
+    matcher = current_catalog().matcher
+    assert "form" not in keywords("Information about our platform", matcher)
+    assert "IT" in keywords("The IT team", matcher)
+    assert "IT" not in keywords("it is done", matcher)
+    assert "hr" not in keywords("three times", matcher)
+    assert "time-consuming" in keywords("time-consuming reports", matcher)
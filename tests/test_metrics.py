@@ -0,0 +1,65 @@
+"""Tests for the engine instrumentation and its cost while disabled."""
+import time
+
+from workflow_optimizer.bench import build_corpus, measure_instrumentation
+from workflow_optimizer.engine import extract_features, generate_response, stage_reporter
+from workflow_optimizer.metrics import METRICS
+
+CORPUS = [item["text"] for item in build_corpus(80, seed=12)]
+ROUNDS = 11
+# Disabled instrumentation may cost at most this fraction of an analysis
+MAX_DISABLED_OVERHEAD = 0.15
+
+
+def no_stages(index):
+    """Baseline start_stage: no progress, cancel or metrics checks at all"""
+
+
+def best_time(analyze):
+    start = time.perf_counter()
+    for text in CORPUS:
+        analyze(text)
+    return time.perf_counter() - start
+
+
+def test_disabled_instrumentation_costs_nothing_measurable():
+    assert not METRICS.enabled
+    baseline, disabled = [], []
+    # Alternate so that load from elsewhere slows both equally
+    for _ in range(ROUNDS):
+        baseline.append(best_time(lambda text: extract_features(text, no_stages)))
+        disabled.append(best_time(lambda text: extract_features(text, stage_reporter())))
+    assert min(disabled) <= min(baseline) * (1 + MAX_DISABLED_OVERHEAD)
+
+
+def state():
+    return dict(METRICS.counters), {key: histogram.count for key, histogram in METRICS.histograms.items()}
+
+
+def test_disabled_instrumentation_records_nothing():
+    before = state()
+    for text in CORPUS[:5]:
+        extract_features(text)
+    assert state() == before
+
+
+def test_enabled_instrumentation_records_stages_and_features():
+    METRICS.enable()
+    try:
+        features = extract_features(CORPUS[0])
+        generate_response(CORPUS[0])
+    finally:
+        METRICS.disable()
+    counters, histograms = state()
+    assert counters[("workflow_analyses_total", (("workflow", features["primary_workflow"]),))] >= 1
+    assert ("workflow_analysis_seconds", ()) in histograms
+    assert ("workflow_stage_seconds", (("stage", "classification"),)) in histograms
+
+
+def test_measure_instrumentation_leaves_the_registry_alone():
+    METRICS.increment("unrelated_total")
+    before = state()
+    result = measure_instrumentation(build_corpus(10, seed=3), rounds=1)
+    assert result["disabled_p50_us"] > 0
+    assert not METRICS.enabled
+    assert state() == before
@@ -0,0 +1,31 @@
+"""The engine package is importable on its own and starts quickly."""
+import os
+import subprocess
+import sys
+
+from workflow_optimizer.bench import measure_import
+
+# Batch workers and API processes should start in tens of milliseconds
+MAX_IMPORT_MS = 100
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_load_streamlit():
+    code = "import sys, workflow_optimizer; print('streamlit' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_cold_import_time():
+    # Best of a few fresh interpreters, so a busy machine doesn't fail the test
+    best = min(measure_import() for _ in range(3))
+    assert best < MAX_IMPORT_MS, f"import took {best:.1f} ms"
+
+
+def test_generate_response_without_ui():
+    from workflow_optimizer import generate_response
+
+    result = generate_response("I copy invoice totals from emails into a spreadsheet every day")
+    assert set(result) == {"automation", "efficiency", "fun"}
+    assert all(result.values())
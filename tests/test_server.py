@@ -0,0 +1,125 @@
+"""HTTP API status codes and connection handling."""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from workflow_optimizer.loadgen import read_response
+from workflow_optimizer.server import AnalysisServer
+
+
+def run_with_server(scenario, **options):
+    """Run scenario(app, reader, writer) against a server on a free port"""
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            app = AnalysisServer(pool, **options)
+            server = await asyncio.start_server(app.handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                return await scenario(app, reader, writer)
+            finally:
+                writer.close()
+                server.close()
+                await server.wait_closed()
+    return asyncio.run(main())
+
+
+async def post(reader, writer, path, payload):
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status, body = await read_response(reader)
+    return status, json.loads(body)
+
+
+def batch(size):
+    return {"items": [{"text": f"daily report number {index}"} for index in range(size)]}
+
+
+def test_batch_within_limits():
+    async def scenario(app, reader, writer):
+        return await post(reader, writer, "/analyze/batch", batch(4))
+
+    status, payload = run_with_server(scenario, max_queue=4)
+    assert status == 200
+    assert len(payload["results"]) == 4
+
+
+def test_oversized_batch_is_413_not_429():
+    async def scenario(app, reader, writer):
+        first = await post(reader, writer, "/analyze/batch", batch(5))
+        # The connection stays usable
+        second = await post(reader, writer, "/analyze", {"text": "weekly invoices"})
+        return first, second, app.rejected
+
+    (status, payload), (next_status, _), rejected = run_with_server(scenario, max_queue=4)
+    assert status == 413
+    assert "limit of 4" in payload["error"]
+    assert next_status == 200
+    assert rejected == 0
+
+
+def test_max_batch_below_max_queue():
+    async def scenario(app, reader, writer):
+        return await post(reader, writer, "/analyze/batch", batch(3))
+
+    status, _ = run_with_server(scenario, max_queue=8, max_batch=2)
+    assert status == 413
+
+
+def test_busy_server_is_429_with_retry_after():
+    async def scenario(app, reader, writer):
+        app.pending = app.max_queue  # as if the queue were full
+        body = json.dumps({"text": "weekly invoices"}).encode()
+        writer.write(f"POST /analyze HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        return head.decode("latin-1")
+
+    head = run_with_server(scenario, max_queue=4)
+    assert head.startswith("HTTP/1.1 429")
+    assert "Retry-After: 1" in head
+
+
+def test_chunked_body_is_refused_and_connection_closed():
+    async def scenario(app, reader, writer):
+        body = json.dumps({"text": "weekly invoices"}).encode()
+        writer.write(
+            b"POST /analyze HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+            + f"{len(body):x}\r\n".encode() + body + b"\r\n0\r\n\r\n"
+        )
+        await writer.drain()
+        status, _ = await read_response(reader)
+        rest = await reader.read()
+        return status, rest
+
+    status, rest = run_with_server(scenario)
+    assert status == 411
+    assert rest == b""  # nothing else answered; the server closed the connection
+
+
+def test_booleans_are_not_numbers():
+    async def scenario(app, reader, writer):
+        results = []
+        for payload in ({"text": "daily report", "creativity_level": True},
+                        {"text": "daily report", "response_length": True},
+                        {"text": "daily report", "creativity_level": 1, "response_length": 100}):
+            results.append(await post(reader, writer, "/analyze", payload))
+        return results
+
+    (first, _), (second, _), (third, _) = run_with_server(scenario)
+    assert (first, second, third) == (400, 400, 200)
+
+
+def test_stalled_body_times_out():
+    async def scenario(app, reader, writer):
+        writer.write(b"POST /analyze HTTP/1.1\r\nHost: test\r\nContent-Length: 100\r\n\r\n{\"text\":")
+        await writer.drain()
+        status, body = await asyncio.wait_for(read_response(reader), 5)
+        closed = await asyncio.wait_for(reader.read(), 5)
+        return status, json.loads(body), closed
+
+    status, payload, closed = run_with_server(scenario, keep_alive_timeout=0.3)
+    assert status == 408
+    assert "in time" in payload["error"]
+    assert closed == b""
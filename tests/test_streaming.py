@@ -0,0 +1,48 @@
+"""stream_response yields suggestions early and keeps to response_length."""
+import time
+
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.engine import SECTIONS, collect_sections, generate_response, stream_response
+
+CORPUS = [item["text"] for item in build_corpus(60, seed=8)]
+
+
+def test_stream_matches_generate_response():
+    for text in CORPUS:
+        for creativity, length in ((0.7, None), (0.3, 120), (1.0, 500)):
+            assert collect_sections(stream_response(text, creativity, length)) == generate_response(text, creativity, length)
+
+
+def test_first_suggestion_before_whole_response():
+    first = total = 0.0
+    for _ in range(3):
+        for text in CORPUS:
+            start = time.perf_counter()
+            stream = stream_response(text)
+            next(stream)
+            first += time.perf_counter() - start
+            for _ in stream:
+                pass
+            total += time.perf_counter() - start
+    assert first < total * 0.95, f"first suggestion after {first / total:.0%} of the total time"
+
+
+def test_response_length_budget():
+    for text in CORPUS:
+        for length in (100, 200, 300, 500):
+            budget = length / len(SECTIONS)
+            words = {section: [] for section in SECTIONS}
+            for section, suggestion in stream_response(text, 1.0, length):
+                words[section].append(len(suggestion.split()))
+            for section, counts in words.items():
+                # Every section gets at least one suggestion; later ones must fit the budget
+                assert counts, section
+                assert len(counts) == 1 or sum(counts) <= budget
+
+
+def test_shorter_budget_gives_fewer_words():
+    for text in CORPUS:
+        short = len(" ".join(generate_response(text, 1.0, 100).values()).split())
+        long = len(" ".join(generate_response(text, 1.0, 500).values()).split())
+        unlimited = len(" ".join(generate_response(text, 1.0).values()).split())
+        assert short <= long <= unlimited
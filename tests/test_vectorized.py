@@ -0,0 +1,53 @@
+"""Tests that extract_features_batch matches extract_features."""
+import random
+
+import pytest
+
+from workflow_optimizer import vectorized
+from workflow_optimizer.bench import build_corpus
+from workflow_optimizer.engine import extract_features
+from workflow_optimizer.vectorized import extract_features_batch
+
+EDGE_CASES = [
+    "",
+    "   \n\t ",
+    "EXCEL Excel excel, excel. (excel)",
+    "I manually copy data from email into a spreadsheet every day for 3 hours",
+    "We get 1500 invoices a month, 20 of them by hand, 999 reports and 1000 emails",
+    "report\nreport\treport   report",
+    "data-entry copy/paste, e-mail; slack: jira!",
+    "weekly weekly daily monthly hourly",
+    "nothing that matches any rule here at all",
+]
+
+
+def corpus():
+    texts = [item["text"] for item in build_corpus(200, seed=21)]
+    rng = random.Random(5)
+    # Shuffled word salads mix keywords from several categories in one text
+    words = " ".join(texts).split()
+    texts += [" ".join(rng.sample(words, rng.randint(1, 60))) for _ in range(100)]
+    return texts + EDGE_CASES + texts[:10]  # repeated texts share tokens
+
+
+def test_batch_matches_extract_features():
+    pytest.importorskip("numpy")
+    texts = corpus()
+    assert extract_features_batch(texts) == [extract_features(text) for text in texts]
+
+
+def test_batches_split_across_matrices(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(vectorized, "BATCH_ROWS", 7)
+    texts = corpus()[:50]
+    assert extract_features_batch(texts) == [extract_features(text) for text in texts]
+
+
+def test_empty_batch():
+    assert extract_features_batch([]) == []
+
+
+def test_fallback_without_numpy(monkeypatch):
+    monkeypatch.setattr(vectorized, "np", None)
+    texts = corpus()[:50]
+    assert extract_features_batch(iter(texts)) == [extract_features(text) for text in texts]
@@ -0,0 +1,10 @@
+"""
+AI Workflow Optimizer analysis engine.
+
+The Streamlit UI lives in app.py; everything here is importable without it.
+"""
+from .engine import AnalysisCancelled, generate_response, stream_response
+from .samples import SAMPLE_INPUTS
+
+# Model display name (keeping IBM branding for display)
+MODEL_DISPLAY_NAME = "IBM Granite 3.3 8B Instruct"
@@ -0,0 +1,355 @@
+"""
+Inference backends and the micro-batching scheduler that feeds them.
+
+A backend turns a batch of requests into results shaped like
+generate_response's ({section: markdown bullet list}). The template engine,
+a deterministic stub with simulated model latency and a local CPU model are
+interchangeable; pick one with create_backend (or WORKFLOW_BACKEND in the UI).
+Backends are loaded once per process and shared; MicroBatchScheduler
+coalesces concurrent requests into batches so a real model runs them
+together instead of one at a time.
+
+To measure batching offline with the stub backend:
+
+    python -m workflow_optimizer.backends --requests 200 --concurrency 32 --batch-sizes 1,8,16
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from .engine import SECTIONS, AnalysisCancelled, generate_response
+
+
+class Backend:
+    """
+    Base class for inference backends.
+
+    Subclasses implement generate_batch; load/unload manage whatever the
+    backend keeps warm between batches (e.g. model weights).
+    """
+    name = "base"
+    streaming = False  # True if results can be streamed through stream_response
+
+    def __init__(self):
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+
+    def unload(self):
+        self.loaded = False
+
+    def reload(self):
+        self.unload()
+        self.load()
+
+    def generate_batch(self, requests):
+        """
+        Return one result per request, in order.
+
+        Each request is a dict with text, creativity_level and response_length.
+        """
+        raise NotImplementedError
+
+
+class TemplateBackend(Backend):
+    """The built-in context-aware template engine (no model needed)"""
+    name = "template"
+    streaming = True
+
+    def generate_batch(self, requests):
+        return [
+            generate_response(request["text"], request["creativity_level"], request["response_length"])
+            for request in requests
+        ]
+
+
+class StubBackend(TemplateBackend):
+    """
+    Deterministic offline stand-in for a model.
+
+    Returns the template engine's output but sleeps like a model would:
+    batch_latency per batch plus item_latency per request, so batching
+    gains can be measured without any model installed.
+    """
+    name = "stub"
+    streaming = False
+
+    def __init__(self, batch_latency=0.05, item_latency=0.002, load_latency=0.0):
+        super().__init__()
+        self.batch_latency = batch_latency
+        self.item_latency = item_latency
+        self.load_latency = load_latency
+
+    def load(self):
+        time.sleep(self.load_latency)
+        super().load()
+
+    def generate_batch(self, requests):
+        time.sleep(self.batch_latency + self.item_latency * len(requests))
+        return super().generate_batch(requests)
+
+
+# Section headings the local model is asked to use, in SECTIONS order
+MODEL_HEADINGS = ["Automation Opportunities", "Efficiency Improvements", "Ideas to Make It Less Boring"]
+
+MODEL_PROMPT = """You are a workflow optimization assistant. Read the work process below and reply with three markdown sections titled exactly "{headings[0]}", "{headings[1]}" and "{headings[2]}", each a short bullet list of concrete suggestions. Use about {words} words in total.
+
+Work process:
+{text}
+"""
+
+
+class LocalModelBackend(Backend):
+    """
+    A Hugging Face causal LM run locally on CPU.
+
+    Needs the optional transformers and torch packages. The model is loaded
+    once in load() and kept warm; each batch is one pipeline call.
+    """
+    name = "local"
+
+    def __init__(self, model_id="ibm-granite/granite-3.3-8b-instruct", max_new_tokens=512):
+        super().__init__()
+        self.model_id = model_id
+        self.max_new_tokens = max_new_tokens
+        self.pipeline = None
+
+    def load(self):
+        try:
+            from transformers import pipeline
+        except ImportError:
+            raise RuntimeError("The local backend needs transformers and torch: pip install transformers torch") from None
+        self.pipeline = pipeline("text-generation", model=self.model_id, device="cpu")
+        super().load()
+
+    def unload(self):
+        self.pipeline = None
+        super().unload()
+
+    def generate_batch(self, requests):
+        prompts = [
+            MODEL_PROMPT.format(headings=MODEL_HEADINGS, words=request["response_length"] or 300, text=request["text"])
+            for request in requests
+        ]
+        outputs = self.pipeline(
+            prompts,
+            batch_size=len(prompts),
+            max_new_tokens=self.max_new_tokens,
+            do_sample=True,
+            # One pipeline call per batch, so the batch shares a temperature
+            temperature=max(requests[0]["creativity_level"], 0.1),
+            return_full_text=False
+        )
+        return [parse_sections(output[0]["generated_text"]) for output in outputs]
+
+
+def parse_sections(text):
+    """Split model output into {section: text} using MODEL_HEADINGS"""
+    lines = {section: [] for section in SECTIONS}
+    current = None
+    for line in text.splitlines():
+        heading = line.strip("#* :").strip()
+        if heading in MODEL_HEADINGS:
+            current = SECTIONS[MODEL_HEADINGS.index(heading)]
+        elif current and line.strip():
+            lines[current].append(line.strip())
+    return {section: "\n".join(section_lines) for section, section_lines in lines.items()}
+
+
+BACKENDS = {
+    "template": TemplateBackend,
+    "stub": StubBackend,
+    "local": LocalModelBackend
+}
+
+
+def create_backend(name="template", **options):
+    """Create (but don't load) the backend registered under name"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    return backend_class(**options)
+
+
+class MicroBatchScheduler:
+    """
+    Coalesces concurrent requests into micro-batches for one backend.
+
+    A worker thread takes the first waiting request, then keeps collecting
+    until it has max_batch_size requests or max_wait seconds have passed
+    since that first one, and sends the whole batch to the backend.
+    Reload the backend through reload(), never directly, so it doesn't
+    unload under a batch in flight.
+    """
+
+    def __init__(self, backend, max_batch_size=8, max_wait=0.01):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.backend_lock = threading.Lock()  # held while the backend runs a batch or reloads
+        self.batches = 0
+        self.items = 0
+        self.closed = False
+        self.worker = threading.Thread(target=self._run, name=f"{backend.name}-scheduler", daemon=True)
+        self.worker.start()
+
+    def submit(self, workflow_text, creativity_level=0.7, response_length=None):
+        """Queue a request and return a Future for its result"""
+        if self.closed:
+            raise RuntimeError("scheduler is closed")
+        future = futures.Future()
+        request = {"text": workflow_text, "creativity_level": creativity_level, "response_length": response_length}
+        self.requests.put((request, future))
+        return future
+
+    def generate(self, workflow_text, creativity_level=0.7, response_length=None, progress=None, cancel=None):
+        """
+        Submit a request and wait for its result (same call shape as generate_response).
+
+        progress is called with the time waited so far every 50 ms until the
+        result is ready (which also lets Streamlit stop a script waiting
+        here); setting cancel abandons the wait and raises AnalysisCancelled.
+        A request abandoned before its batch starts is dropped.
+        """
+        if progress is not None:
+            progress(0, 1, f"Waiting for {self.backend.name} backend")
+        future = self.submit(workflow_text, creativity_level, response_length)
+        start = time.monotonic()
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise AnalysisCancelled("backend")
+                try:
+                    result = future.result(timeout=0.05)
+                    break
+                except futures.TimeoutError:
+                    pass
+                if progress is not None:
+                    progress(0, 1, f"Waiting for {self.backend.name} backend ({time.monotonic() - start:.1f}s)")
+        except BaseException:
+            future.cancel()
+            raise
+        if progress is not None:
+            progress(1, 1, "Done")
+        return result
+
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None)  # finish this batch, then stop
+                    break
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch):
+        # Skip requests whose caller already gave up
+        batch = [(request, future) for request, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            with self.backend_lock:
+                results = self.backend.generate_batch([request for request, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def reload(self):
+        """
+        Reload the backend between batches.
+
+        Waits for the batch in flight; requests arriving meanwhile stay
+        queued and run on the reloaded backend.
+        """
+        with self.backend_lock:
+            self.backend.reload()
+
+    def close(self):
+        """Stop the worker after the requests already queued"""
+        if not self.closed:
+            self.closed = True
+            self.requests.put(None)
+            self.worker.join()
+
+
+def measure_batching(backend, requests=200, concurrency=32, max_batch_size=8, max_wait=0.01):
+    """
+    Send requests from concurrency threads through a new scheduler and return a summary dict.
+
+    The backend must already be loaded. Results are checked against
+    generate_response.
+    """
+    scheduler = MicroBatchScheduler(backend, max_batch_size, max_wait)
+    texts = [f"I copy {index} invoice totals from emails into a spreadsheet every day" for index in range(requests)]
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(scheduler.generate, texts))
+        elapsed = time.perf_counter() - start
+    finally:
+        scheduler.close()
+    return {
+        "max_batch_size": max_batch_size,
+        "requests": requests,
+        "seconds": elapsed,
+        "requests_per_sec": requests / elapsed if elapsed else 0.0,
+        "batches": scheduler.batches,
+        "mean_batch": scheduler.items / scheduler.batches if scheduler.batches else 0.0,
+        "matches_engine": results == [generate_response(text) for text in texts]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.backends",
+        description="Measure micro-batching throughput under concurrent load."
+    )
+    parser.add_argument("--backend", default="stub", choices=list(BACKENDS), help="backend to load (default: stub)")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="requests to send (default: 200)")
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="threads sending requests (default: 32)")
+    parser.add_argument("--batch-sizes", default="1,8,16", help="comma-separated max batch sizes (default: 1,8,16)")
+    parser.add_argument("--max-wait", type=float, default=0.01, help="seconds to wait for a batch to fill (default: 0.01)")
+    parser.add_argument("--json", action="store_true", help="print the summaries as JSON")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.backend)
+    backend.load()
+    summaries = [
+        measure_batching(backend, args.requests, args.concurrency, int(size), args.max_wait)
+        for size in args.batch_sizes.split(",") if size
+    ]
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+        return
+    for summary in summaries:
+        print(f"batch size {summary['max_batch_size']:3d}: {summary['requests_per_sec']:7.1f} req/s, "
+              f"{summary['batches']} batches (mean {summary['mean_batch']:.1f}), "
+              f"results {'match' if summary['matches_engine'] else 'DIFFER FROM'} the engine")
+
+
+if __name__ == "__main__":
+    main()
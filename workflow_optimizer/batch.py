@@ -0,0 +1,235 @@
+"""
+Bulk workflow analysis from the command line.
+
+Streams workflow descriptions from a JSONL or CSV file (or stdin), analyzes
+them on a thread or process pool and streams the results out in input order:
+
+    python -m workflow_optimizer.batch requests.jsonl --text-field body --id-field request_id
+
+With --features, only the classification (workflow type, tools, frequency,
+volume, pain points) is written, which is much cheaper for bulk scoring.
+With --near-duplicates THRESHOLD, each result also names the earlier record
+it nearly duplicates (duplicate_of), and the clusters found are reported.
+Only a bounded number of chunks is in flight at any time, so memory stays
+flat no matter how large the input is.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from .dedup import NearDuplicateIndex
+from .engine import collect_sections, stream_suggestions
+from .vectorized import extract_features_batch
+
+RESULT_FIELDS = ["automation", "efficiency", "fun"]
+FEATURE_FIELDS = ["primary_workflow", "workflow_scores", "tools", "frequency", "volume", "pain_points"]
+
+
+def read_records(stream, input_format):
+    """Yield one dict per input record without reading the whole stream"""
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_number}: invalid JSON ({e})") from None
+        if not isinstance(record, dict):
+            raise ValueError(f"line {line_number}: expected a JSON object")
+        yield record
+
+
+def analyze_chunk(texts, creativity_level, response_length=None):
+    """Analyze a chunk of texts; module-level so process pools can pickle it"""
+    # Same results as generate_response per text, with the features extracted as one batch
+    return [
+        collect_sections(stream_suggestions(features, creativity_level, response_length))
+        for features in extract_features_batch(texts)
+    ]
+
+
+def classify_chunk(texts, creativity_level=None, response_length=None):
+    """Extract only the features of a chunk of texts (the suggestion settings are ignored)"""
+    return [
+        {field: features[field] for field in FEATURE_FIELDS}
+        for features in extract_features_batch(texts)
+    ]
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(records, write, text_field="text", id_field=None, creativity_level=0.7, response_length=None,
+              workers=None, executor="process", chunk_size=32, max_in_flight=None, features=False,
+              near_duplicates=None):
+    """
+    Analyze records on a pool and pass each output row to write, in input order.
+
+    At most max_in_flight chunks (default: 2 per worker) are submitted ahead
+    of the one being written. With features=True rows hold FEATURE_FIELDS
+    instead of suggestions. With a NearDuplicateIndex as near_duplicates,
+    every row gets a duplicate_of field: the id (or input position, from 0)
+    of the earlier record the text nearly duplicates, or None. Returns the
+    number of records processed. A text that is not a string (or null) is a
+    ValueError.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    task = classify_chunk if features else analyze_chunk
+
+    count = 0
+    submitted = 0
+    pending = deque()  # (chunk of records, duplicate_of per record, future), oldest first
+
+    def drain_one():
+        chunk, duplicates, future = pending.popleft()
+        for record, duplicate_of, result in zip(chunk, duplicates, future.result()):
+            row = {id_field: record.get(id_field)} if id_field else {}
+            row.update(result)
+            if near_duplicates is not None:
+                row["duplicate_of"] = duplicate_of
+            write(row)
+        return len(chunk)
+
+    with pool_class(max_workers=workers) as pool:
+        for chunk in chunked(records, chunk_size):
+            texts = [record.get(text_field) or "" for record in chunk]
+            for index, text in enumerate(texts):
+                if not isinstance(text, str):
+                    raise ValueError(f"record {submitted + index + 1}: {text_field} must be a string")
+            duplicates = [None] * len(chunk)
+            if near_duplicates is not None:
+                for index, (record, text) in enumerate(zip(chunk, texts)):
+                    label = record.get(id_field) if id_field else submitted + index
+                    match = near_duplicates.match_or_add(label, text)
+                    duplicates[index] = match[0] if match else None
+            submitted += len(chunk)
+            pending.append((chunk, duplicates, pool.submit(task, texts, creativity_level, response_length)))
+            if len(pending) >= max_in_flight:
+                count += drain_one()
+        while pending:
+            count += drain_one()
+
+    return count
+
+
+def detect_format(path, requested):
+    """Pick the input/output format from the --format flag or the file extension"""
+    if requested:
+        return requested
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.batch",
+        description="Analyze many workflow descriptions from a JSONL or CSV file."
+    )
+    parser.add_argument("input", help="JSONL or CSV file to read, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL or CSV file to write (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from file extension)")
+    parser.add_argument("--output-format", choices=["jsonl", "csv"], help="output format (default: from file extension)")
+    parser.add_argument("--text-field", default="text", help="field holding the workflow description (default: text)")
+    parser.add_argument("--id-field", help="field copied to each result to identify it")
+    parser.add_argument("--creativity", type=float, default=0.7, help="creativity level, 0.1-1.0 (default: 0.7)")
+    parser.add_argument("--response-length", type=int, help="word budget per response (default: no limit)")
+    parser.add_argument("-j", "--workers", type=int, help="pool size (default: CPU count)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process", help="pool type (default: process)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="records per task sent to the pool (default: 32)")
+    parser.add_argument("--max-in-flight", type=int, help="chunks queued ahead of the writer (default: 2 per worker)")
+    parser.add_argument("--features", action="store_true",
+                        help="write only the classification features; larger --chunk-size values batch better")
+    parser.add_argument("--near-duplicates", type=float, metavar="THRESHOLD",
+                        help="mark records whose text is at least this similar (0-1) to an earlier one")
+    parser.add_argument("--clusters", help="with --near-duplicates, write the clusters to this JSON file")
+    parser.add_argument("--near-capacity", type=int, default=100000,
+                        help="earlier texts remembered for --near-duplicates, about 700 bytes each (default: 100000)")
+    args = parser.parse_args(argv)
+
+    if args.clusters and args.near_duplicates is None:
+        parser.error("--clusters requires --near-duplicates")
+    near_duplicates = NearDuplicateIndex(args.near_duplicates, capacity=args.near_capacity) if args.near_duplicates is not None else None
+    cluster_sizes = Counter()  # first record -> number of its near-duplicates
+
+    input_format = detect_format(args.input, args.format)
+    output_format = detect_format(args.output, args.output_format)
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+
+    if output_format == "csv":
+        fields = ([args.id_field] if args.id_field else []) + (FEATURE_FIELDS if args.features else RESULT_FIELDS)
+        if near_duplicates is not None:
+            fields.append("duplicate_of")
+        writer = csv.DictWriter(sink, fieldnames=fields)
+        writer.writeheader()
+
+        def write_row(row):
+            # Lists and dicts (features) are written as JSON
+            writer.writerow({
+                name: json.dumps(value) if isinstance(value, (list, dict)) else value
+                for name, value in row.items()
+            })
+    else:
+        def write_row(row):
+            sink.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def write(row):
+        if row.get("duplicate_of") is not None:
+            cluster_sizes[row["duplicate_of"]] += 1
+        write_row(row)
+
+    start = time.perf_counter()
+    try:
+        count = run_batch(
+            read_records(source, input_format), write,
+            text_field=args.text_field, id_field=args.id_field,
+            creativity_level=args.creativity, response_length=args.response_length,
+            workers=args.workers,
+            executor=args.executor, chunk_size=args.chunk_size,
+            max_in_flight=args.max_in_flight, features=args.features,
+            near_duplicates=near_duplicates
+        )
+    except ValueError as e:
+        parser.exit(1, f"error: {e}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - start
+
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {count} workflows in {elapsed:.2f}s ({rate:.1f} items/sec)", file=sys.stderr)
+
+    if near_duplicates is not None:
+        duplicates = sum(cluster_sizes.values())
+        print(f"{duplicates} near-duplicates of {len(cluster_sizes)} earlier workflows", file=sys.stderr)
+        for first, size in cluster_sizes.most_common(5):
+            print(f"  {first}: {size} near-duplicates", file=sys.stderr)
+        if args.clusters:
+            with open(args.clusters, "w", encoding="utf-8") as f:
+                json.dump([{"first": first, "near_duplicates": size} for first, size in cluster_sizes.most_common()], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
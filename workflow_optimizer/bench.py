@@ -0,0 +1,399 @@
+"""
+Benchmark suite for the analysis pipeline.
+
+Builds a reproducible corpus of workflow descriptions from the sample
+inputs, then measures:
+
+* cold import time of the engine package
+* per-call latency of generate_response and time to the first streamed suggestion
+* time spent in each pipeline stage (see engine.STAGES); numbers are
+  extracted by the same keyword scan as classification, so they are
+  timed there, and the frequency stage covers turning them into a volume
+* throughput on thread and process pools of several sizes
+* peak memory
+* cost of the metrics instrumentation, disabled and enabled
+* a fixed calibration workload, to tell a slower machine from slower code
+
+Results are written as JSON so runs can be compared:
+
+    python -m workflow_optimizer.bench --output after.json --compare before.json
+
+With --compare, a median latency (from at least --min-samples calls) or a
+throughput that is worse than the baseline by more than --threshold is
+reported and the exit code is 1. Tail percentiles, single measurements
+and differences are printed but not compared: on a shared machine they
+change by more than any sensible threshold between runs of the same code.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+from .batch import run_batch
+from .engine import STAGES, generate_response, stream_response
+from .metrics import METRICS
+from .samples import SAMPLE_INPUTS
+
+# Sentences without any classification keywords, used to dilute keyword density
+FILLER_SENTENCES = [
+    "After lunch I usually pick this up again where I left off.",
+    "Nobody else on the team knows the exact steps.",
+    "The process has been the same for a few years now.",
+    "Sometimes I have to wait for a colleague before I can continue.",
+    "I keep notes on a sticky pad next to my desk.",
+    "It is not difficult to learn but there are many small details.",
+    "My manager asked me to look for ways to improve it.",
+    "On Fridays there is usually a bit more of it."
+]
+
+# (name, sentence count range) for generated descriptions
+LENGTH_CLASSES = [("short", (1, 3)), ("medium", (5, 15)), ("long", (40, 120))]
+
+# (name, share of sentences taken from the sample workflows)
+DENSITY_CLASSES = [("sparse", 0.2), ("mixed", 0.5), ("dense", 0.9)]
+
+
+def sample_sentences():
+    """Split the sample workflows into sentences"""
+    sentences = []
+    for text in SAMPLE_INPUTS.values():
+        sentences.extend(sentence for sentence in re.split(r"(?<=\.)\s+", text) if sentence)
+    return sentences
+
+
+def build_corpus(size=300, seed=1234):
+    """
+    Return a reproducible list of {"length", "density", "text"} workflows.
+
+    Every length class is combined with every density class in turn; numbers
+    in the sentences are varied so the texts don't repeat.
+    """
+    rng = random.Random(seed)
+    keyword_sentences = sample_sentences()
+    corpus = []
+    for index in range(size):
+        length_name, (low, high) = LENGTH_CLASSES[index % len(LENGTH_CLASSES)]
+        density_name, density = DENSITY_CLASSES[(index // len(LENGTH_CLASSES)) % len(DENSITY_CLASSES)]
+        sentences = []
+        for _ in range(rng.randint(low, high)):
+            source = keyword_sentences if rng.random() < density else FILLER_SENTENCES
+            sentence = rng.choice(source)
+            sentences.append(re.sub(r"\d+", lambda _: str(rng.randint(1, 200)), sentence))
+        corpus.append({"length": length_name, "density": density_name, "text": " ".join(sentences)})
+    return corpus
+
+
+def distribution(seconds):
+    """Summarize a list of durations in microseconds"""
+    values = sorted(seconds)
+    if not values:
+        return {}
+
+    def rank(fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))] * 1e6
+
+    return {
+        "count": len(values),
+        "mean_us": sum(values) / len(values) * 1e6,
+        "p50_us": rank(0.50),
+        "p95_us": rank(0.95),
+        "p99_us": rank(0.99),
+        "max_us": values[-1] * 1e6
+    }
+
+
+def calibration_workload():
+    """Fixed pure-Python work (string building, hashing, sorting) that doesn't use the engine"""
+    words = [f"word{index % 997}" for index in range(20000)]
+    counts = {}
+    for word in words:
+        counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=counts.get)
+
+
+def measure_calibration(repeat=5):
+    """Best time of calibration_workload in microseconds, a measure of how fast the machine is right now"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calibration_workload()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def measure_import():
+    """Cold import time of the package, in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import workflow_optimizer; print(time.perf_counter() - t)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    return float(output.stdout) * 1000
+
+
+def measure_latency(corpus, creativity_level=0.7, repeat=3, calibrations=None):
+    """
+    Per-call latency, time to first streamed suggestion and per-stage time.
+
+    Every item is timed in repeat passes over the corpus and its fastest
+    time is kept, so a burst of load from elsewhere on the machine only
+    counts if it hits the same item in every pass. If calibrations is a
+    list, the calibration workload is timed before each pass and appended.
+    """
+    calls = [float("inf")] * len(corpus)
+    first_suggestion = [float("inf")] * len(corpus)
+    stage_times = {name: [float("inf")] * len(corpus) for name, _ in STAGES}
+
+    for _ in range(repeat):
+        if calibrations is not None:
+            calibrations.append(measure_calibration())
+        for index, item in enumerate(corpus):
+            marks = []
+
+            def record(done, total, label):
+                marks.append(time.perf_counter())
+
+            start = time.perf_counter()
+            generate_response(item["text"], creativity_level, progress=record)
+            calls[index] = min(calls[index], time.perf_counter() - start)
+            # marks[i] is when stage i started; the last mark is completion
+            for (name, _), begin, end in zip(STAGES, marks, marks[1:]):
+                stage_times[name][index] = min(stage_times[name][index], end - begin)
+
+            start = time.perf_counter()
+            next(stream_response(item["text"], creativity_level))
+            first_suggestion[index] = min(first_suggestion[index], time.perf_counter() - start)
+
+    by_class = {}
+    for item, seconds in zip(corpus, calls):
+        by_class.setdefault(f"{item['length']}/{item['density']}", []).append(seconds)
+
+    return {
+        "generate_response": distribution(calls),
+        "first_suggestion": distribution(first_suggestion),
+        "stages": {name: distribution(times) for name, times in stage_times.items()},
+        "by_class": {name: distribution(times) for name, times in sorted(by_class.items())}
+    }
+
+
+def measure_throughput(corpus, worker_counts, executors=("thread", "process"), repeat=3, calibrations=None):
+    """
+    Items/sec through the batch runner for each executor type and pool size, best of repeat runs.
+
+    calibrations is used like in measure_latency, before each run.
+    """
+    results = {}
+    for _ in range(repeat):
+        for executor in executors:
+            for workers in worker_counts:
+                if calibrations is not None:
+                    calibrations.append(measure_calibration())
+                start = time.perf_counter()
+                count = run_batch(iter(corpus), lambda row: None, executor=executor, workers=workers, chunk_size=16)
+                elapsed = time.perf_counter() - start
+                name = f"{executor}x{workers}"
+                results[name] = max(results.get(name, 0.0), count / elapsed if elapsed else 0.0)
+    return results
+
+
+def measure_memory(corpus):
+    """Peak Python allocations during one pass over the corpus, and process max RSS (None on Windows)"""
+    tracemalloc.start()
+    for item in corpus:
+        generate_response(item["text"])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+    if max_rss is not None and sys.platform == "darwin":
+        max_rss //= 1024
+    return {"traced_peak_kib": peak / 1024, "max_rss_kib": max_rss}
+
+
+def measure_instrumentation(corpus, rounds=3):
+    """
+    Median per-call latency with METRICS disabled and enabled.
+
+    Rounds alternate between the two so drift affects both equally. What
+    the enabled rounds record goes into an empty registry that is dropped
+    afterwards, so METRICS keeps only what the rest of the process recorded.
+    """
+    was_enabled = METRICS.enabled
+    with METRICS.lock:
+        saved = METRICS.counters, METRICS.histograms
+        METRICS.counters, METRICS.histograms = {}, {}
+    times = {False: [], True: []}
+    try:
+        for _ in range(rounds):
+            for enabled in (False, True):
+                METRICS.enabled = enabled
+                for item in corpus:
+                    start = time.perf_counter()
+                    generate_response(item["text"])
+                    times[enabled].append(time.perf_counter() - start)
+    finally:
+        METRICS.enabled = was_enabled
+        with METRICS.lock:
+            METRICS.counters, METRICS.histograms = saved
+    disabled = distribution(times[False])["p50_us"]
+    enabled = distribution(times[True])["p50_us"]
+    return {"disabled_p50_us": disabled, "enabled_p50_us": enabled, "enabled_overhead_us": enabled - disabled}
+
+
+def run_benchmarks(corpus_size=300, seed=1234, worker_counts=(1, 2, 4), throughput=True, repeat=3):
+    """Run the whole suite and return the results dict"""
+    corpus = build_corpus(corpus_size, seed)
+    # Warm up caches (matcher token cache, bytecode) before timing
+    for item in corpus[:20]:
+        generate_response(item["text"])
+
+    # Timed between the passes of each measurement; the best time per
+    # measurement describes the machine during it
+    calibrations = {"latency": [], "throughput": []}
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "corpus_size": corpus_size,
+            "seed": seed,
+            "repeat": repeat,
+            "corpus_chars": sum(len(item["text"]) for item in corpus)
+        },
+        "import_ms": measure_import(),
+        "latency": measure_latency(corpus, repeat=repeat, calibrations=calibrations["latency"]),
+        "memory": measure_memory(corpus),
+        "instrumentation": measure_instrumentation(corpus)
+    }
+    if throughput:
+        results["throughput"] = measure_throughput(corpus, worker_counts, repeat=repeat,
+                                                   calibrations=calibrations["throughput"])
+    results["calibration_us"] = {name: min(times) for name, times in calibrations.items() if times}
+    return results
+
+
+def flatten(results, prefix=""):
+    """Yield (dotted name, value) for every number in a results dict"""
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, name + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def gated(name, values, min_samples):
+    """Whether compare checks a metric: throughput, or a p50 of at least min_samples calls"""
+    if name.startswith("throughput."):
+        return True
+    if not name.endswith(".p50_us"):
+        return False
+    count = values.get(name[:-len("p50_us")] + "count", 0)
+    return count >= min_samples
+
+
+def compare(baseline, current, threshold=0.10, min_delta=2.0, min_samples=50):
+    """
+    Return [(metric, baseline, current, change)] for metrics that regressed.
+
+    Only medians of at least min_samples calls (in both runs) and
+    throughputs are compared: a latency median regresses when it grows by
+    more than threshold, a throughput when it drops by more than threshold.
+    Changes smaller than min_delta (in the metric's own unit) are ignored.
+
+    When both runs timed the calibration workload during a measurement,
+    its current values are first scaled to the baseline's machine speed,
+    so a machine that is busier or slower as a whole doesn't count as a
+    regression. The returned current value is the scaled one.
+    """
+    old = dict(flatten(baseline))
+    new = dict(flatten(current))
+    regressions = []
+    for name, value in new.items():
+        if name not in old or not old[name] or not (gated(name, old, min_samples) and gated(name, new, min_samples)):
+            continue
+        calibration = "calibration_us." + name.split(".", 1)[0]
+        if old.get(calibration) and new.get(calibration):
+            speedup = old[calibration] / new[calibration]
+            value = value / speedup if name.startswith("throughput.") else value * speedup
+        if abs(value - old[name]) < min_delta:
+            continue
+        change = (value - old[name]) / old[name]
+        higher_is_better = name.startswith("throughput.")
+        if (change < -threshold) if higher_is_better else (change > threshold):
+            regressions.append((name, old[name], value, change))
+    return regressions
+
+
+def print_summary(results):
+    latency = results["latency"]
+    print(f"import: {results['import_ms']:.1f} ms")
+    for name in ("generate_response", "first_suggestion"):
+        stats = latency[name]
+        print(f"{name}: p50 {stats['p50_us']:.0f} us, p95 {stats['p95_us']:.0f} us, p99 {stats['p99_us']:.0f} us")
+    print("stages (p50 / p95 us):")
+    for name, stats in latency["stages"].items():
+        print(f"  {name:15s} {stats['p50_us']:8.1f} / {stats['p95_us']:8.1f}")
+    print("by length/density (p50 us):")
+    for name, stats in latency["by_class"].items():
+        print(f"  {name:15s} {stats['p50_us']:8.1f}")
+    for name, rate in results.get("throughput", {}).items():
+        print(f"throughput {name}: {rate:.0f} items/sec")
+    instrumentation = results["instrumentation"]
+    print(f"metrics: p50 {instrumentation['disabled_p50_us']:.0f} us disabled, "
+          f"{instrumentation['enabled_p50_us']:.0f} us enabled")
+    memory = results["memory"]
+    max_rss = f"{memory['max_rss_kib']} KiB" if memory["max_rss_kib"] is not None else "n/a"
+    print(f"memory: traced peak {memory['traced_peak_kib']:.0f} KiB, max RSS {max_rss}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.bench",
+        description="Benchmark the workflow analysis pipeline."
+    )
+    parser.add_argument("-n", "--corpus-size", type=int, default=300, help="number of generated workflows (default: 300)")
+    parser.add_argument("--seed", type=int, default=1234, help="corpus seed (default: 1234)")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated pool sizes for throughput (default: 1,2,4)")
+    parser.add_argument("--no-throughput", action="store_true", help="skip the pool throughput runs")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="passes per latency and throughput measurement, keeping the best (default: 3)")
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown (default: 0.10)")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="ignore smaller absolute changes (default: 2.0)")
+    parser.add_argument("--min-samples", type=int, default=50,
+                        help="compare a median only if it is over at least this many calls (default: 50)")
+    args = parser.parse_args(argv)
+
+    worker_counts = [int(count) for count in args.workers.split(",") if count]
+    results = run_benchmarks(args.corpus_size, args.seed, worker_counts, not args.no_throughput, args.repeat)
+    print_summary(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold, args.min_delta, args.min_samples)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Result cache for workflow analyses.
+
+generate_response is deterministic for a given (text, creativity), so its
+results can be reused across reruns and sessions. ResultCache keeps an
+in-memory LRU bounded by entry count and size, optionally backed by a SQLite
+file that several server processes can share. With a NearDuplicateIndex,
+a description that only differs from an earlier one in wording, numbers or
+punctuation reuses that one's result.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .engine import SECTIONS, generate_response, normalize_text, stream_response
+
+
+def text_digest(workflow_text):
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(workflow_text).encode()).hexdigest()
+
+
+def cache_key(workflow_text, creativity_level=0.7, response_length=None, namespace="template", digest=None):
+    """Digest of the normalized text plus every setting that affects the result"""
+    digest = digest or text_digest(workflow_text)
+    return f"{namespace}:{digest}:{creativity_level}:{response_length}"
+
+
+def result_size(key, result):
+    """Approximate memory held by a cached entry, in bytes"""
+    return len(key) + sum(len(name) + len(text.encode()) for name, text in result.items())
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of analysis results.
+
+    Entries are evicted oldest-first once there are more than max_entries of
+    them or they hold more than max_bytes of text. If path is given, results
+    are also written to a SQLite file and looked up there on a memory miss,
+    so they survive restarts and are shared between worker processes. The
+    file keeps the max_disk_entries most recently written results; older
+    rows are deleted every max_disk_entries // 100 writes (and on opening).
+    namespace separates results from different backends in a shared store.
+
+    near_duplicates, a NearDuplicateIndex, is consulted by analyze and
+    stream on an exact miss: the result cached for the most similar earlier
+    text with the same settings is returned instead of computing a new
+    one. A text is added to the index once its result is stored. The index
+    lives in memory only and is keyed by text digest.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, path=None, namespace="template",
+                 near_duplicates=None, max_disk_entries=100000):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.near_duplicates = near_duplicates
+        self.entries = OrderedDict()  # key -> (result, size)
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.max_disk_entries = max_disk_entries
+        self.disk_writes = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+            self._prune_disk()
+            self.db.commit()
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        with self.lock:
+            result = self._fetch(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def _fetch(self, key):
+        """Look key up in memory, then on disk, without counting a hit or miss (lock held)"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry[0]
+
+        if self.db is not None:
+            row = self.db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                self._remember(key, result)
+                self.disk_hits += 1
+                return result
+        return None
+
+    def lookup(self, workflow_text, creativity_level=0.7, response_length=None):
+        """
+        Return (key, cached result or None) for the inputs.
+
+        On an exact miss the near-duplicate index, if any, is searched, most
+        similar text first, for one with a result cached under the same
+        settings. Pass the text to put along with the result, so similar
+        texts can find it.
+        """
+        digest = text_digest(workflow_text)
+        key = cache_key(workflow_text, creativity_level, response_length, self.namespace, digest)
+        with self.lock:
+            result = self._fetch(key)
+            if result is not None:
+                self.hits += 1
+                return key, result
+
+        if self.near_duplicates is not None:
+            for near_digest, _ in self.near_duplicates.candidates(workflow_text):
+                near_key = cache_key(workflow_text, creativity_level, response_length, self.namespace, near_digest)
+                with self.lock:
+                    result = self._fetch(near_key)
+                    if result is not None:
+                        self.hits += 1
+                        self.near_hits += 1
+                        return key, result
+
+        with self.lock:
+            self.misses += 1
+        return key, None
+
+    def put(self, key, result, workflow_text=None):
+        """
+        Store a result in memory and, if configured, on disk.
+
+        workflow_text, the text key was made for, is added to the
+        near-duplicate index (if any) after the result is stored.
+        """
+        with self.lock:
+            self._remember(key, result)
+            if self.db is not None:
+                # REPLACE deletes and re-inserts, so rowids follow write order
+                self.db.execute("INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)",
+                                (key, json.dumps(result)))
+                self.disk_writes += 1
+                if self.disk_writes % max(self.max_disk_entries // 100, 1) == 0:
+                    self._prune_disk()
+                self.db.commit()
+        if self.near_duplicates is not None and workflow_text is not None:
+            self.near_duplicates.add(text_digest(workflow_text), workflow_text)
+
+    def _prune_disk(self):
+        """Delete all but the max_disk_entries newest rows (lock held or during setup)"""
+        self.db.execute(
+            "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def _remember(self, key, result):
+        """Insert into the in-memory LRU and evict down to the bounds (lock held)"""
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        size = result_size(key, result)
+        self.entries[key] = (result, size)
+        self.bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def analyze(self, workflow_text, creativity_level=0.7, response_length=None, compute=generate_response, **options):
+        """
+        Return the cached analysis for the inputs, computing and storing it on a miss.
+
+        Extra keyword options (e.g. progress, cancel) are passed to compute.
+        """
+        key, result = self.lookup(workflow_text, creativity_level, response_length)
+        if result is None:
+            result = compute(workflow_text, creativity_level, response_length, **options)
+            self.put(key, result, workflow_text)
+        return result
+
+    def stream(self, workflow_text, creativity_level=0.7, response_length=None, compute=None, **options):
+        """
+        Yield (section, suggestion) pairs like stream_response, from the cache if possible.
+
+        On a miss the result is stored once the stream has been fully consumed
+        (an abandoned or cancelled stream stores nothing). compute, if given,
+        is a non-streaming function called like generate_response (e.g. a
+        backend scheduler's generate); its result is replayed as a stream.
+        """
+        key, result = self.lookup(workflow_text, creativity_level, response_length)
+        if result is None and compute is not None:
+            result = compute(workflow_text, creativity_level, response_length, **options)
+            self.put(key, result, workflow_text)
+        if result is not None:
+            for section in SECTIONS:
+                for suggestion in result[section].splitlines():
+                    yield section, suggestion
+            return
+
+        suggestions = {section: [] for section in SECTIONS}
+        for section, suggestion in stream_response(workflow_text, creativity_level, response_length, **options):
+            suggestions[section].append(suggestion)
+            yield section, suggestion
+        self.put(key, {section: "\n".join(lines) for section, lines in suggestions.items()}, workflow_text)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.bytes
+            }
+
+    def clear(self):
+        """Drop every in-memory entry (the on-disk store is kept)"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,287 @@
+"""
+Classification rules and suggestion catalog used by the analysis engine.
+
+The catalog is data: catalog.json next to this module (or the file named by
+WORKFLOW_CATALOG) holds the keyword tables and the suggestion templates.
+It is validated and compiled once into a Catalog of read-only mappings and
+tuples with interned strings, together with the KeywordMatcher built from
+its keyword tables.
+
+The compiled tables are also written as a snapshot to __pycache__ next to
+the file (like bytecode) and reused while the file's modification time and
+size are unchanged, so new processes skip parsing and validation. The
+snapshot is stored with marshal, which only holds plain data and, like a
+.pyc, does not run code when it is loaded.
+
+current_catalog() checks the file at most every WORKFLOW_CATALOG_RELOAD
+seconds (default 2; 0 turns checking off) and switches to the new catalog
+when it changed, so running servers pick up edits without a restart. An
+edit that fails validation is reported as a warning and the previous
+catalog stays in use.
+"""
+import json
+import marshal
+import os
+import string
+import sys
+import threading
+import time
+import warnings
+from types import MappingProxyType
+
+from .matcher import KeywordMatcher
+
+# Bumped when the file layout or the compiled form changes
+CATALOG_VERSION = 1
+
+CATALOG_PATH = os.environ.get("WORKFLOW_CATALOG") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+
+RELOAD_INTERVAL = float(os.environ.get("WORKFLOW_CATALOG_RELOAD", "2"))
+
+# Keyword tables: table name in the file -> name in KeywordMatcher hits
+KEYWORD_TABLES = ["workflow_types", "tools", "time_indicators", "pain_indicators"]
+
+# Suggestion tables: (section, part) -> (Catalog attribute, keyword table the
+# keys come from, one suggestion or a list per key)
+SUGGESTION_TABLES = {
+    ("automation", "workflow"): ("workflow_automations", "workflow_types", list),
+    ("automation", "tool"): ("tool_automations", "tools", dict),
+    ("automation", "pain"): ("pain_automations", "pain_indicators", dict),
+    ("efficiency", "workflow"): ("workflow_efficiencies", "workflow_types", list),
+    ("efficiency", "frequency"): ("frequency_efficiencies", "time_indicators", dict),
+    ("efficiency", "pain"): ("pain_efficiencies", "pain_indicators", dict),
+    ("fun", "workflow"): ("workflow_fun", "workflow_types", list),
+    ("fun", "pain"): ("pain_fun", "pain_indicators", dict)
+}
+
+# Tables whose "general" entry is used when the primary workflow has none
+FALLBACK_TABLES = ["workflow_automations", "workflow_efficiencies"]
+
+
+class CatalogError(ValueError):
+    """Raised for a catalog file that is not valid"""
+
+
+class Catalog:
+    """
+    A compiled catalog.
+
+    Keyword tables map category -> tuple of keywords; suggestion tables map
+    a workflow type, tool, frequency or pain point to a suggestion, or to a
+    tuple of them (the workflow tables and general_fun). A suggestion is a
+    (template, choices, ...) tuple as render_suggestion expects.
+    """
+
+    __slots__ = (
+        "workflow_types", "tools", "time_indicators", "pain_indicators",
+        "workflow_automations", "tool_automations", "pain_automations",
+        "workflow_efficiencies", "frequency_efficiencies", "pain_efficiencies",
+        "general_fun", "workflow_fun", "pain_fun",
+        "matcher", "path", "stamp"
+    )
+
+    def __init__(self, tables, path=None, stamp=None):
+        for name, value in tables.items():
+            object.__setattr__(self, name, MappingProxyType(value) if isinstance(value, dict) else value)
+        object.__setattr__(self, "matcher", KeywordMatcher({name: tables[name] for name in KEYWORD_TABLES}))
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "stamp", stamp)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Catalog is immutable")
+
+
+# ---- VALIDATION ----
+
+def check(condition, where, message):
+    if not condition:
+        raise CatalogError(f"{where}: {message}")
+
+
+def check_words(value, where):
+    check(isinstance(value, list) and value, where, "expected a non-empty list of strings")
+    for index, item in enumerate(value):
+        check(isinstance(item, str) and item.strip(), f"{where}[{index}]", "expected a non-empty string")
+
+
+def check_suggestion(value, where):
+    check(isinstance(value, dict) and set(value) == {"template", "choices"}, where,
+          'expected {"template": ..., "choices": [[...], ...]}')
+    template, choices = value["template"], value["choices"]
+    check(isinstance(template, str), where, "template must be a string")
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+    except ValueError as e:
+        raise CatalogError(f"{where}: invalid template ({e})") from None
+    check(all(field == "" for field in fields), where, "template placeholders must be plain {}")
+    check(isinstance(choices, list), where, "choices must be a list of lists")
+    check(len(fields) == len(choices), where,
+          f"template has {len(fields)} placeholder(s) but {len(choices)} choice list(s)")
+    for index, options in enumerate(choices):
+        check_words(options, f"{where}.choices[{index}]")
+
+
+def validate(data, where="catalog"):
+    """Raise CatalogError unless data (the parsed file) is a valid catalog"""
+    check(isinstance(data, dict), where, "expected a JSON object")
+    check(data.get("version") == CATALOG_VERSION, f"{where}.version", f"expected {CATALOG_VERSION}")
+    for table in KEYWORD_TABLES:
+        categories = data.get(table)
+        check(isinstance(categories, dict) and categories, f"{where}.{table}", "expected a non-empty object")
+        for category, keywords in categories.items():
+            check_words(keywords, f"{where}.{table}.{category}")
+
+    sections = {}
+    for section, part in SUGGESTION_TABLES:
+        sections.setdefault(section, {"general"} if section == "fun" else set()).add(part)
+    for key in data:
+        check(key == "version" or key in KEYWORD_TABLES or key in sections, f"{where}.{key}", "unknown table")
+    for section, parts in sections.items():
+        check(isinstance(data.get(section), dict), f"{where}.{section}", "expected an object")
+        for part in data[section]:
+            check(part in parts, f"{where}.{section}.{part}", "unknown table")
+    for (section, part), (name, keys, shape) in SUGGESTION_TABLES.items():
+        table = data[section].get(part)
+        place = f"{where}.{section}.{part}"
+        check(isinstance(table, dict), place, "expected an object")
+        allowed = set(data[keys]) | ({"general"} if name in FALLBACK_TABLES else set())
+        for key, value in table.items():
+            check(key in allowed, f"{place}.{key}", f"not a category of {keys}")
+            if shape is list:
+                check(isinstance(value, list) and value, f"{place}.{key}", "expected a non-empty list of suggestions")
+                for index, suggestion in enumerate(value):
+                    check_suggestion(suggestion, f"{place}.{key}[{index}]")
+            else:
+                check_suggestion(value, f"{place}.{key}")
+        if name in FALLBACK_TABLES:
+            check("general" in table, place, 'needs a "general" entry')
+
+    general = data["fun"].get("general")
+    check(isinstance(general, list) and general, f"{where}.fun.general", "expected a non-empty list of suggestions")
+    for index, suggestion in enumerate(general):
+        check_suggestion(suggestion, f"{where}.fun.general[{index}]")
+
+
+# ---- COMPILATION ----
+
+def compile_suggestion(value):
+    return (sys.intern(value["template"]),) + tuple(
+        tuple(sys.intern(option) for option in options) for options in value["choices"]
+    )
+
+
+def compile_tables(data):
+    """Turn validated data into the plain dicts and tuples a Catalog is built from"""
+    tables = {}
+    for table in KEYWORD_TABLES:
+        tables[table] = {
+            sys.intern(category): tuple(sys.intern(keyword) for keyword in keywords)
+            for category, keywords in data[table].items()
+        }
+    for (section, part), (name, _, shape) in SUGGESTION_TABLES.items():
+        tables[name] = {
+            sys.intern(key): tuple(map(compile_suggestion, value)) if shape is list else compile_suggestion(value)
+            for key, value in data[section][part].items()
+        }
+    tables["general_fun"] = tuple(map(compile_suggestion, data["fun"]["general"]))
+    return tables
+
+
+# ---- LOADING ----
+
+def file_stamp(path):
+    """(modification time, size) of path; a changed stamp means a changed file"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def snapshot_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__", f"{name}.v{CATALOG_VERSION}.marshal")
+
+
+def read_snapshot(path, stamp):
+    """The compiled tables saved for path at stamp, or None"""
+    try:
+        with open(snapshot_path(path), "rb") as f:
+            saved_path, saved_stamp, tables = marshal.load(f)
+    except Exception:
+        return None
+    if (saved_path, saved_stamp) != (os.path.abspath(path), stamp) or not isinstance(tables, dict):
+        return None
+    return tables
+
+
+def write_snapshot(path, stamp, tables):
+    """Save compiled tables; like bytecode, failing to write is not an error"""
+    target = snapshot_path(path)
+    temporary = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(temporary, "wb") as f:
+            marshal.dump((os.path.abspath(path), stamp, tables), f)
+        os.replace(temporary, target)
+    except OSError:
+        pass
+
+
+def load_catalog(path=CATALOG_PATH, use_snapshot=True):
+    """Load, validate and compile the catalog at path, through its snapshot if it is current"""
+    stamp = file_stamp(path)
+    tables = read_snapshot(path, stamp) if use_snapshot else None
+    if tables is None:
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise CatalogError(f"{path}: invalid JSON ({e})") from None
+        validate(data, path)
+        tables = compile_tables(data)
+        if use_snapshot:
+            write_snapshot(path, stamp, tables)
+    return Catalog(tables, path, stamp)
+
+
+_current = None
+_checked = 0.0
+_rejected = ()    # stamp (None: missing) of a changed file that failed to load, reported once
+_lock = threading.Lock()
+
+
+def current_catalog():
+    """
+    The catalog in use, reloaded if its file changed.
+
+    The file is checked at most every RELOAD_INTERVAL seconds, so this is a
+    clock read on almost every call.
+    """
+    global _current, _checked, _rejected
+    catalog = _current
+    if catalog is not None and (RELOAD_INTERVAL <= 0 or time.monotonic() - _checked < RELOAD_INTERVAL):
+        return catalog
+
+    with _lock:
+        if _current is None:
+            _current = load_catalog(CATALOG_PATH)
+            _checked = time.monotonic()
+        elif time.monotonic() - _checked >= RELOAD_INTERVAL:
+            _checked = time.monotonic()
+            stamp = None
+            try:
+                stamp = file_stamp(_current.path)
+                if stamp != _current.stamp and stamp != _rejected:
+                    _current = load_catalog(_current.path)
+            except (OSError, ValueError) as e:
+                if stamp != _rejected:
+                    warnings.warn(f"keeping the previous catalog: {e}", RuntimeWarning)
+                _rejected = stamp
+        return _current
+
+
+def reload_catalog(path=None):
+    """Load the catalog from path (default: the current one's file) now and use it"""
+    global _current, _checked
+    with _lock:
+        _current = load_catalog(path or (_current.path if _current is not None else CATALOG_PATH))
+        _checked = time.monotonic()
+        return _current
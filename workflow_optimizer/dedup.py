@@ -0,0 +1,188 @@
+"""
+Near-duplicate detection for workflow descriptions.
+
+Descriptions are compared by the Jaccard similarity of their sets of
+adjacent word pairs (lowercased, with digits and punctuation removed, so
+changed numbers or punctuation don't matter), estimated with a one-pass
+MinHash: every word pair is hashed once and the lowest hash per bin kept.
+
+NearDuplicateIndex splits the signatures into bands (locality-sensitive
+hashing), so a lookup only compares against the stored descriptions that
+share a band with it instead of all of them. The index keeps at most
+capacity signatures, and at most max_bucket keys per band bucket, dropping
+the oldest first, so memory and lookup time stay bounded however many
+descriptions pass through it.
+
+Signatures use Python's built-in hash, which is salted per process: they
+can be compared within one process but should not be stored.
+"""
+import string
+import sys
+import threading
+from array import array
+from collections import Counter, OrderedDict
+
+# Digits and ASCII punctuation become spaces before splitting into words
+WORD_TRANSLATION = str.maketrans({char: " " for char in string.digits + string.punctuation})
+
+EMPTY_BIN = sys.maxsize
+
+# Signatures keep the low 32 bits of each bin, halving their memory
+BIN_MASK = 0xFFFFFFFF
+
+# Smallest chance that a pair at exactly the threshold shares a band
+BAND_RECALL = 0.95
+
+
+def signature(workflow_text, num_bins=64):
+    """
+    Return the MinHash signature of the text as an array of num_bins 32-bit values.
+
+    Returns None for text without any words.
+    """
+    words = workflow_text.lower().translate(WORD_TRANSLATION).split()
+    if not words:
+        return None
+    shingles = set(zip(words, words[1:])) or set(words)
+
+    # Sorted high to low, so the last value written for a bin is its lowest
+    hashes = sorted(map(hash, shingles), reverse=True)
+    lowest = dict(zip(map(num_bins.__rmod__, hashes), hashes))
+    mins = [lowest.get(index, EMPTY_BIN) for index in range(num_bins)]
+
+    # Fill empty bins from the next filled one (densification), offset by
+    # the distance so borrowed values rarely collide by accident
+    if len(lowest) < num_bins:
+        source = None
+        # Walk backwards over two laps, so every empty bin has seen a filled one after it
+        for position in range(2 * num_bins - 1, -1, -1):
+            index = position % num_bins
+            if index in lowest:
+                source = position
+            elif position < num_bins:
+                mins[index] = lowest[source % num_bins] + (source - position) * 0x9E3779B97F4A7C15
+    return array("I", [value & BIN_MASK for value in mins])
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def choose_bands(threshold, num_bins):
+    """
+    Pick (bands, rows) with bands * rows == num_bins for a similarity threshold.
+
+    Takes the most rows per band (the fewest chance candidates) for which a
+    pair at exactly threshold still shares a band with probability at least
+    BAND_RECALL, on the banding S-curve 1 - (1 - s**rows)**bands. Candidates
+    are checked against threshold afterwards, so a chance candidate costs one
+    comparison, while a missed near-duplicate is never found.
+    """
+    for rows in range(num_bins, 0, -1):
+        if num_bins % rows:
+            continue
+        bands = num_bins // rows
+        if 1 - (1 - threshold ** rows) ** bands >= BAND_RECALL:
+            return bands, rows
+    return num_bins, 1
+
+
+class NearDuplicateIndex:
+    """
+    Thread-safe LSH index from keys to MinHash signatures.
+
+    query returns the stored key most similar to a text if its estimated
+    similarity is at least threshold (0-1]. Only the max_candidates keys
+    sharing the most bands with the text are compared.
+    """
+
+    def __init__(self, threshold=0.8, num_bins=64, capacity=100000, max_bucket=64, max_candidates=16):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be between 0 and 1")
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.capacity = capacity
+        self.max_bucket = max_bucket
+        self.max_candidates = max_candidates
+        self.bands, self.rows = choose_bands(threshold, num_bins)
+        self.entries = OrderedDict()                    # key -> signature, oldest first
+        self.buckets = [{} for _ in range(self.bands)]  # per band: band key -> key, or [key, ...] oldest first
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def band_keys(self, mins):
+        rows = self.rows
+        return [hash(tuple(mins[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def query(self, workflow_text, mins=None):
+        """Return (key, similarity) of the closest stored near-duplicate, or None"""
+        matches = self.candidates(workflow_text, mins)
+        return matches[0] if matches else None
+
+    def candidates(self, workflow_text, mins=None):
+        """Return [(key, similarity)] of every stored near-duplicate found, closest first"""
+        mins = mins if mins is not None else signature(workflow_text, self.num_bins)
+        if mins is None:
+            return []
+        matches = []
+        with self.lock:
+            shared = Counter()
+            for bucket, band_key in zip(self.buckets, self.band_keys(mins)):
+                keys = bucket.get(band_key)
+                if isinstance(keys, list):
+                    shared.update(keys)
+                elif keys is not None:
+                    shared[keys] += 1
+            for key, _ in shared.most_common(self.max_candidates):
+                score = similarity(mins, self.entries[key])
+                if score >= self.threshold:
+                    matches.append((key, score))
+        # Stable, so ties keep the order of most shared bands
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def add(self, key, workflow_text, mins=None):
+        """Store the text's signature under key (texts without words are ignored)"""
+        mins = mins if mins is not None else signature(workflow_text, self.num_bins)
+        if mins is None:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = mins
+            # Most buckets hold a single key, stored without a list
+            for bucket, band_key in zip(self.buckets, self.band_keys(mins)):
+                keys = bucket.get(band_key)
+                if keys is None:
+                    bucket[band_key] = key
+                elif not isinstance(keys, list):
+                    bucket[band_key] = [keys, key]
+                else:
+                    keys.append(key)
+                    if len(keys) > self.max_bucket:
+                        del keys[0]  # the dropped key stays findable through its other bands
+            while len(self.entries) > self.capacity:
+                self._remove(next(iter(self.entries)))
+
+    def match_or_add(self, key, workflow_text):
+        """Return the closest stored near-duplicate like query; if there is none, add the text under key"""
+        mins = signature(workflow_text, self.num_bins)
+        match = self.query(workflow_text, mins)
+        if match is None:
+            self.add(key, workflow_text, mins)
+        return match
+
+    def _remove(self, key):
+        """Drop key from the entries and its buckets (lock held)"""
+        for bucket, band_key in zip(self.buckets, self.band_keys(self.entries.pop(key))):
+            keys = bucket.get(band_key)
+            if isinstance(keys, list):
+                if key in keys:
+                    keys.remove(key)
+                    if len(keys) == 1:
+                        bucket[band_key] = keys[0]
+            elif keys == key:
+                del bucket[band_key]
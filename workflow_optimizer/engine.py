@@ -0,0 +1,340 @@
+"""
+Workflow analysis engine.
+
+Headless: importing this module does not import Streamlit, so batch jobs and
+API processes can use generate_response directly.
+"""
+import hashlib
+import random
+import time
+
+from .catalog import current_catalog
+from .metrics import METRICS
+
+# Pipeline stages in order, with the label reported while each one runs
+STAGES = [
+    ("classification", "Classifying workflow"),
+    ("tools", "Detecting tools"),
+    ("frequency", "Analyzing frequency and volume"),
+    ("pain_points", "Detecting pain points"),
+    ("automation", "Finding automation opportunities"),
+    ("efficiency", "Finding efficiency improvements"),
+    ("fun", "Finding ideas to make it less boring")
+]
+
+# Suggestion sections, in the order they are produced
+SECTIONS = ["automation", "efficiency", "fun"]
+
+# Assumed when the description mentions no pain point
+DEFAULT_PAIN_POINTS = ["time_consuming", "inefficient"]
+
+
+def keyword_matcher():
+    """The KeywordMatcher of the catalog in use, shared by every call"""
+    return current_catalog().matcher
+
+
+def render_suggestion(suggestion, rng):
+    """Fill a (template, choices, ...) suggestion with one pick per slot from rng"""
+    template, *slots = suggestion
+    return template.format(*(rng.choice(choices) for choices in slots))
+
+
+def normalize_text(workflow_text):
+    """Collapse whitespace so reformatted copies of a description analyze identically"""
+    return " ".join(workflow_text.split())
+
+
+class AnalysisCancelled(Exception):
+    """Raised by the engine when its cancel token is set"""
+
+
+def stage_reporter(progress=None, cancel=None):
+    """
+    Return a start_stage(index) function for the pipeline.
+
+    progress, if given, is called as progress(done, total, label) when each
+    stage in STAGES starts (and with done == total at the end). cancel may be
+    a threading.Event (or anything with is_set()); once it is set,
+    AnalysisCancelled is raised at the start of the next stage.
+    While METRICS is enabled, stage durations are recorded when the
+    pipeline finishes.
+    """
+    if METRICS.enabled:
+        return timed_stage_reporter(progress, cancel)
+
+    def start_stage(index):
+        if index == len(STAGES):
+            if progress is not None:
+                progress(index, len(STAGES), "Done")
+            return
+        if cancel is not None and cancel.is_set():
+            raise AnalysisCancelled(STAGES[index][0])
+        if progress is not None:
+            progress(index, len(STAGES), STAGES[index][1])
+    return start_stage
+
+
+def timed_stage_reporter(progress=None, cancel=None):
+    """stage_reporter that also records each stage's duration into METRICS"""
+    marks = []  # (stage index, start time)
+
+    def start_stage(index):
+        marks.append((index, time.perf_counter()))
+        if index == len(STAGES):
+            if progress is not None:
+                progress(index, len(STAGES), "Done")
+            # When streaming, a section's time includes the consumer's work
+            # between suggestions
+            for (stage, begin), (_, end) in zip(marks, marks[1:]):
+                METRICS.observe("workflow_stage_seconds", end - begin, stage=STAGES[stage][0])
+            METRICS.observe("workflow_analysis_seconds", marks[-1][1] - marks[0][1])
+            return
+        if cancel is not None and cancel.is_set():
+            raise AnalysisCancelled(STAGES[index][0])
+        if progress is not None:
+            progress(index, len(STAGES), STAGES[index][1])
+    return start_stage
+
+
+def workflow_fingerprint(workflow_text):
+    """Seed value for the input; whitespace-only differences don't change it"""
+    return fingerprint_words(workflow_text.split())
+
+
+def fingerprint_words(words):
+    """workflow_fingerprint of a text already split on whitespace"""
+    return int(hashlib.md5(" ".join(words).encode()).hexdigest(), 16) % 10000
+
+
+def estimate_volume(numbers, fingerprint):
+    """Sum of the reasonable numbers mentioned, or a stable guess from the fingerprint"""
+    mentioned_numbers = [int(num) for num in numbers if int(num) < 1000]  # Reasonable values only
+    return sum(mentioned_numbers) if mentioned_numbers else random.Random(fingerprint).randint(10, 50)
+
+
+def record_feature_metrics(features):
+    """Count the primary workflow and pain points in METRICS (caller checks enabled)"""
+    METRICS.increment("workflow_analyses_total", workflow=features["primary_workflow"])
+    for pain in features["pain_points"]:
+        METRICS.increment("workflow_pain_points_total", pain=pain)
+
+
+def extract_features(workflow_text, start_stage=None):
+    """
+    Classify the workflow and detect tools, frequency, volume and pain points.
+
+    Returns a dict of features that the suggestion sections are selected from.
+    """
+    start_stage = start_stage or stage_reporter()
+    catalog = current_catalog()
+    
+    # ---- WORKFLOW TYPE CLASSIFICATION ----
+    start_stage(0)
+    # Identify keywords, tools, frequency, pain points and numbers in one pass
+    hits, numbers = catalog.matcher.scan(workflow_text)
+    features = features_from_hits(hits, numbers, workflow_fingerprint(workflow_text), start_stage, catalog)
+    if METRICS.enabled:
+        record_feature_metrics(features)
+    return features
+
+
+def features_from_hits(hits, numbers, workflow_hash, start_stage=None, catalog=None):
+    """
+    Build the features dict from KeywordMatcher.scan output and the fingerprint.
+
+    The rest of extract_features after the scan, for callers that obtain
+    the hits another way (e.g. merged from cached segments). catalog should
+    be the one whose matcher found the hits (default: the current one).
+    """
+    start_stage = start_stage or stage_reporter()
+    catalog = catalog or current_catalog()
+    
+    # Score each workflow type by how many of its keywords appear
+    type_hits = hits["workflow_types"]
+    workflow_scores = {wtype: len(type_hits.get(wtype, ())) for wtype in catalog.workflow_types}
+    primary_workflow = max(workflow_scores.items(), key=lambda x: x[1])[0] if any(workflow_scores.values()) else "general"
+    
+    # ---- TOOLS IDENTIFICATION ----
+    start_stage(1)
+    tools_mentioned = [category for category in catalog.tools if category in hits["tools"]]
+    
+    # ---- TIME & FREQUENCY ANALYSIS ----
+    start_stage(2)
+    frequency = next((freq for freq in catalog.time_indicators if freq in hits["time_indicators"]), "unknown")
+    
+    # Extract numeric values
+    volume = estimate_volume(numbers, workflow_hash)
+    
+    # ---- PAIN POINTS DETECTION ----
+    start_stage(3)
+    pain_points = [pain for pain in catalog.pain_indicators if pain in hits["pain_indicators"]]
+    
+    if not pain_points:  # Default pain points if none detected
+        pain_points = list(DEFAULT_PAIN_POINTS)
+    
+    return {
+        "fingerprint": workflow_hash,
+        "workflow_scores": workflow_scores,
+        "primary_workflow": primary_workflow,
+        "tools": tools_mentioned,
+        "frequency": frequency,
+        "volume": volume,
+        "pain_points": pain_points
+    }
+
+
+# ---- SUGGESTION SECTIONS ----
+# Each builder returns the unrendered templates chosen for one section.
+# Suggestions are picked as templates first; only the ones that survive the
+# sampling are rendered.
+
+def automation_options(features, rng, num_suggestions, catalog):
+    """Pick automation opportunity templates"""
+    # Select appropriate automation suggestions based on primary workflow
+    primary_workflow = features["primary_workflow"]
+    workflow_type = primary_workflow if primary_workflow in catalog.workflow_automations else "general"
+    options = list(catalog.workflow_automations[workflow_type])
+    
+    # Add tool-specific automation suggestions if tools were detected
+    for tool in features["tools"]:
+        if tool in catalog.tool_automations and rng.random() < 0.7:  # 70% chance to include tool suggestion
+            options.append(catalog.tool_automations[tool])
+    
+    # Add pain-point specific automation suggestions
+    for pain in features["pain_points"]:
+        if pain in catalog.pain_automations and rng.random() < 0.8:  # 80% chance to include pain suggestion
+            options.append(catalog.pain_automations[pain])
+    
+    # Select a random subset
+    if len(options) > num_suggestions:
+        options = rng.sample(options, num_suggestions)
+    return options
+
+
+def efficiency_options(features, rng, num_suggestions, catalog):
+    """Pick efficiency improvement templates"""
+    # Select appropriate efficiency suggestions based on primary workflow
+    primary_workflow = features["primary_workflow"]
+    workflow_type = primary_workflow if primary_workflow in catalog.workflow_efficiencies else "general"
+    options = list(catalog.workflow_efficiencies[workflow_type])
+    
+    # Add frequency-based efficiency suggestions
+    if features["frequency"] in catalog.frequency_efficiencies:
+        options.append(catalog.frequency_efficiencies[features["frequency"]])
+    
+    # Add pain-point specific efficiency suggestions
+    for pain in features["pain_points"]:
+        if pain in catalog.pain_efficiencies and rng.random() < 0.8:  # 80% chance to include pain suggestion
+            options.append(catalog.pain_efficiencies[pain])
+    
+    # Select a random subset
+    if len(options) > num_suggestions:
+        options = rng.sample(options, num_suggestions)
+    return options
+
+
+def fun_options(features, rng, num_suggestions, catalog):
+    """Pick templates for ideas to make the task less boring"""
+    # Start with general fun suggestions
+    options = rng.sample(catalog.general_fun, min(3, len(catalog.general_fun)))
+    
+    # Add workflow-specific fun suggestions if available
+    primary_workflow = features["primary_workflow"]
+    if primary_workflow in catalog.workflow_fun:
+        specific_fun = rng.sample(catalog.workflow_fun[primary_workflow], min(2, len(catalog.workflow_fun[primary_workflow])))
+        options.extend(specific_fun)
+    
+    # Add pain-specific fun suggestions
+    for pain in catalog.pain_fun:
+        if pain in features["pain_points"]:
+            options.append(catalog.pain_fun[pain])
+    
+    # Select a random subset
+    if len(options) > num_suggestions:
+        options = rng.sample(options, num_suggestions)
+    return options
+
+
+SECTION_OPTIONS = {
+    "automation": automation_options,
+    "efficiency": efficiency_options,
+    "fun": fun_options
+}
+
+
+def select_suggestions(section, features, creativity_level=0.7, catalog=None):
+    """
+    Yield the rendered suggestions for one section, one at a time.
+
+    Each section draws from its own RNG seeded from the input fingerprint and
+    creativity, so the result is consistent but unique per input, sections
+    don't depend on each other, and nothing touches the global random state.
+    """
+    catalog = catalog or current_catalog()
+    rng = random.Random(f"{features['fingerprint']}:{creativity_level}:{section}")
+    num_suggestions = 3 + int(creativity_level * 2)  # higher creativity = more suggestions
+    for suggestion in SECTION_OPTIONS[section](features, rng, num_suggestions, catalog):
+        yield render_suggestion(suggestion, rng)
+
+
+def stream_response(workflow_text, creativity_level=0.7, response_length=None, progress=None, cancel=None,
+                    extract=None):
+    """
+    Yield (section, suggestion) pairs as soon as each one is produced.
+
+    response_length is a word budget for the whole response, split evenly
+    between SECTIONS; each section always gets at least one suggestion and
+    stops before the one that would exceed its share. None means no limit.
+    progress and cancel are described in stage_reporter. extract replaces
+    extract_features (same signature), e.g. with a caching extractor.
+    """
+    start_stage = stage_reporter(progress, cancel)
+    features = (extract or extract_features)(workflow_text, start_stage)
+    yield from stream_suggestions(features, creativity_level, response_length, start_stage)
+
+
+def stream_suggestions(features, creativity_level=0.7, response_length=None, start_stage=None):
+    """
+    Yield (section, suggestion) pairs for already extracted features.
+
+    This is the second half of stream_response, for callers that extract
+    features some other way (e.g. in bulk).
+    """
+    start_stage = start_stage or stage_reporter()
+    section_budget = response_length / len(SECTIONS) if response_length else None
+    
+    for offset, section in enumerate(SECTIONS):
+        start_stage(4 + offset)
+        words = 0
+        for suggestion in select_suggestions(section, features, creativity_level):
+            length = len(suggestion.split())
+            if section_budget is not None and words and words + length > section_budget:
+                break
+            words += length
+            yield section, suggestion
+    
+    start_stage(len(STAGES))
+
+
+# Function to generate responses based on workflow type
+def generate_response(workflow_text, creativity_level=0.7, response_length=None, progress=None, cancel=None,
+                      extract=None):
+    """
+    Generate workflow optimization suggestions based on the input text
+    This replaces the actual LLM with context-aware response generation
+
+    Returns {section: markdown bullet list} for every section in SECTIONS.
+    Takes the same options as stream_response.
+    """
+    return collect_sections(stream_response(workflow_text, creativity_level, response_length, progress, cancel, extract))
+
+
+def collect_sections(pairs):
+    """Assemble (section, suggestion) pairs into {section: markdown bullet list}"""
+    suggestions = {section: [] for section in SECTIONS}
+    for section, suggestion in pairs:
+        suggestions[section].append(suggestion)
+    
+    # Return assembled suggestions
+    return {section: "\n".join(lines) for section, lines in suggestions.items()}
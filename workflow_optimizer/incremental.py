@@ -0,0 +1,159 @@
+"""
+Incremental feature extraction for text that is edited and re-analyzed.
+
+IncrementalFeatures splits a description into sentences and keeps the
+keyword matches and numbers found in each one. When the text is analyzed
+again after an edit, only the sentences that changed are matched (through
+a shared SegmentCache) and the totals are adjusted, giving the same
+features a cold extract_features call would return.
+
+Sentences are split at ". " (a plain str.split, several times faster than
+a regex over the text). Keywords never span a full stop (multi-word
+keywords only allow spaces and hyphens between their words), and a token
+never contains a space, so matching sentence by sentence finds exactly the
+keywords and numbers that matching the whole text does.
+
+When the catalog is reloaded, the cached sentences are dropped and each
+editor matches its whole text again on its next call.
+"""
+import threading
+from collections import Counter, OrderedDict
+
+from .catalog import current_catalog
+from .engine import (
+    METRICS,
+    features_from_hits, record_feature_metrics, stage_reporter, workflow_fingerprint
+)
+
+SENTENCE_BOUNDARY = ". "
+
+
+def split_segments(workflow_text):
+    """Split text into sentences (the boundaries themselves are dropped)"""
+    return workflow_text.split(SENTENCE_BOUNDARY)
+
+
+class SegmentCache:
+    """
+    Thread-safe LRU of KeywordMatcher results per sentence.
+
+    Can be shared by every editor (e.g. all UI sessions), since a sentence
+    always matches the same way. Without a catalog, it follows the current
+    one and is cleared when that is reloaded.
+    """
+
+    def __init__(self, catalog=None, max_segments=4096):
+        self.follow = catalog is None
+        self.catalog = catalog or current_catalog()
+        self.max_segments = max_segments
+        self.segments = OrderedDict()  # sentence -> (entries, numbers)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def current(self):
+        """The catalog the cached results are for, switching to a reloaded one first"""
+        if self.follow:
+            catalog = current_catalog()
+            if catalog is not self.catalog:
+                with self.lock:
+                    if catalog is not self.catalog:
+                        self.catalog = catalog
+                        self.segments.clear()
+        return self.catalog
+
+    def lookup(self, segment):
+        """Return (entries, numbers) for one sentence, like KeywordMatcher.match"""
+        with self.lock:
+            cached = self.segments.get(segment)
+            if cached is not None:
+                self.segments.move_to_end(segment)
+                self.hits += 1
+                return cached
+        entries, numbers = self.catalog.matcher.match(segment)
+        cached = (frozenset(entries), tuple(numbers))
+        with self.lock:
+            self.misses += 1
+            self.segments[segment] = cached
+            while len(self.segments) > self.max_segments:
+                self.segments.popitem(last=False)
+        return cached
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "segments": len(self.segments)}
+
+    def clear(self):
+        with self.lock:
+            self.segments.clear()
+
+
+class IncrementalFeatures:
+    """
+    Features of one text that is being edited.
+
+    Each call compares the new sentences with the previous ones; only the
+    changed run between the unchanged beginning and end is looked up, and
+    the keyword and number totals are adjusted by the difference.
+    extract_features has the same signature and result as
+    engine.extract_features, so it can be passed as stream_response's
+    extract option. Not thread-safe: use one instance per editor.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or SegmentCache()
+        self.catalog = None              # catalog the totals were matched with
+        self.segments = []               # current sentences
+        self.results = []                # (entries, numbers) per sentence
+        self.entry_counts = Counter()    # entry -> sentences containing it
+        self.number_counts = Counter()   # number -> occurrences
+
+    def update(self, workflow_text):
+        """Bring the totals up to date with workflow_text and return (entries, numbers)"""
+        catalog = self.cache.current()
+        if catalog is not self.catalog:
+            # Matched with another catalog: start over
+            self.catalog = catalog
+            self.segments = []
+            self.results = []
+            self.entry_counts = Counter()
+            self.number_counts = Counter()
+        old = self.segments
+        new = split_segments(workflow_text)
+        limit = min(len(old), len(new))
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+            suffix += 1
+
+        added = [self.cache.lookup(segment) for segment in new[prefix:len(new) - suffix]]
+        for entries, numbers in self.results[prefix:len(old) - suffix]:
+            self.entry_counts.subtract(entries)
+            self.number_counts.subtract(numbers)
+        for entries, numbers in added:
+            self.entry_counts.update(entries)
+            self.number_counts.update(numbers)
+        self.results[prefix:len(old) - suffix] = added
+        self.segments = new
+
+        # Drop totals that fell to zero
+        self.entry_counts = +self.entry_counts
+        self.number_counts = +self.number_counts
+        return set(self.entry_counts), list(self.number_counts.elements())
+
+    def features(self, workflow_text, start_stage=None):
+        """Features for the text, without counting it in METRICS (e.g. for previews)"""
+        start_stage = start_stage or stage_reporter()
+        start_stage(0)
+        entries, numbers = self.update(workflow_text)
+        return features_from_hits(self.catalog.matcher.group(entries), numbers, workflow_fingerprint(workflow_text),
+                                  start_stage, self.catalog)
+
+    def extract_features(self, workflow_text, start_stage=None):
+        """Drop-in replacement for engine.extract_features"""
+        features = self.features(workflow_text, start_stage)
+        if METRICS.enabled:
+            record_feature_metrics(features)
+        return features
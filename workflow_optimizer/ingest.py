@@ -0,0 +1,190 @@
+"""
+Streaming analysis of large documents (process manuals, SOP exports).
+
+DocumentFeatures is fed a document a chunk at a time and keeps only what
+the features need: the keyword entries found so far, the sum and count of
+the reasonable numbers, and a running MD5 for the fingerprint. Memory stays
+flat however large the document is; only one chunk (and its lowercased copy
+for multi-word keywords) is held at once.
+
+Chunks are cut at the last whitespace, so no token is split between two of
+them, and the last few tokens of each chunk are searched again with the next
+one, so multi-word keywords spanning a boundary are found. The features are
+the same as extract_features returns for the whole text. Plain text,
+Markdown and CSV are all read as text.
+"""
+import argparse
+import codecs
+import hashlib
+import sys
+import time
+from collections import Counter
+
+from .catalog import current_catalog
+from .engine import (
+    METRICS, STAGES,
+    AnalysisCancelled, estimate_volume, features_from_hits, record_feature_metrics,
+    stage_reporter, stream_suggestions
+)
+
+# Bytes read per chunk
+CHUNK_SIZE = 1024 * 1024
+
+# A token longer than this (e.g. a base64 blob) is cut rather than carried over
+MAX_CARRY = 64 * 1024
+
+
+class DocumentFeatures:
+    """
+    Features of a document fed in chunks.
+
+    feed text in order, then call features(). The whole document is read
+    with one catalog (default: the current one), even if it is reloaded
+    meanwhile. Not thread-safe.
+    """
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog or current_catalog()
+        matcher = self.matcher = self.catalog.matcher
+        self.entries = set()
+        self.number_sum = 0
+        self.number_count = 0
+        self.digest = hashlib.md5()
+        self.started = False  # any token fingerprinted yet
+        self.carry = ""       # unfinished last token of the previous chunk
+        self.overlap = []     # last tokens scanned so far, for phrases
+
+        # Tokens needed to hold the longest multi-word keyword; hyphens
+        # written as separate tokens ("time - consuming") count double
+        longest = max((len(words) for words in matcher.index), default=1)
+        self.overlap_tokens = 2 * longest
+
+    def feed(self, text):
+        """Add the next piece of the document"""
+        text = self.carry + text
+        cut = len(text)
+        while cut and not text[cut - 1].isspace():
+            cut -= 1
+        if cut == 0 and len(text) <= MAX_CARRY:
+            self.carry = text
+            return
+        if cut == 0:
+            cut = len(text)
+        self.carry = text[cut:]
+        self._scan(text[:cut])
+
+    def close(self):
+        """Process the rest of the document after the last feed"""
+        if self.carry:
+            self._scan(self.carry)
+            self.carry = ""
+
+    def _scan(self, text):
+        words = text.split()
+        if not words:
+            return
+        joined = " ".join(words)
+        self.digest.update(((" " if self.started else "") + joined).encode())
+        self.started = True
+
+        heads = set()
+        for token, count in Counter(words).items():
+            entries, numbers, token_heads = self.matcher.token_info(token)
+            self.entries.update(entries)
+            # Same filter as estimate_volume
+            reasonable = [int(num) for num in numbers if int(num) < 1000]
+            self.number_sum += sum(reasonable) * count
+            self.number_count += len(reasonable) * count
+            heads.update(token_heads)
+
+        # Multi-word keywords, including ones that started in the previous chunk
+        for token in self.overlap:
+            heads.update(self.matcher.token_info(token)[2])
+        if heads:
+            self.entries.update(self.matcher.match_phrases(" ".join(self.overlap + [joined]), heads))
+        self.overlap = (self.overlap + words[-self.overlap_tokens:])[-self.overlap_tokens:]
+
+    def features(self, start_stage=None):
+        """The features dict, like extract_features; call close() first"""
+        fingerprint = int(self.digest.hexdigest(), 16) % 10000
+        features = features_from_hits(self.matcher.group(self.entries), (), fingerprint, start_stage, self.catalog)
+        if self.number_count:
+            features["volume"] = self.number_sum
+        else:
+            features["volume"] = estimate_volume((), fingerprint)
+        return features
+
+
+def read_chunks(stream, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    """Yield (text, bytes read so far) from a binary or text stream"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    position = 0
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        position += len(data)
+        yield (decoder.decode(data) if isinstance(data, bytes) else data), position
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail, position
+
+
+def extract_document_features(stream, size=None, start_stage=None, progress=None, cancel=None,
+                              chunk_size=CHUNK_SIZE):
+    """
+    Return the features of the document read from stream.
+
+    size (in bytes, if known) lets progress report how much of the first
+    stage is done as progress(fraction, len(STAGES), label). cancel is
+    checked after every chunk.
+    """
+    start_stage = start_stage or stage_reporter(progress, cancel)
+    start_stage(0)
+    document = DocumentFeatures()
+    for text, position in read_chunks(stream, chunk_size):
+        document.feed(text)
+        if cancel is not None and cancel.is_set():
+            raise AnalysisCancelled(STAGES[0][0])
+        if progress is not None and size:
+            progress(min(position / size, 1.0), len(STAGES), f"Reading document ({position // (1024 * 1024)} MB)")
+    document.close()
+    features = document.features(start_stage)
+    if METRICS.enabled:
+        record_feature_metrics(features)
+    return features
+
+
+def stream_document(stream, creativity_level=0.7, response_length=None, size=None, progress=None, cancel=None,
+                    chunk_size=CHUNK_SIZE):
+    """Yield (section, suggestion) pairs for a document, like stream_response"""
+    start_stage = stage_reporter(progress, cancel)
+    features = extract_document_features(stream, size, start_stage, progress, cancel, chunk_size)
+    yield from stream_suggestions(features, creativity_level, response_length, start_stage)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.ingest",
+        description="Analyze a large text, Markdown or CSV document in chunks."
+    )
+    parser.add_argument("path", help="document to read, or - for stdin")
+    parser.add_argument("--creativity", type=float, default=0.7, help="creativity level, 0.1-1.0 (default: 0.7)")
+    parser.add_argument("--response-length", type=int, help="word budget per response (default: no limit)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"bytes per chunk (default: {CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        for section, suggestion in stream_document(source, args.creativity, args.response_length,
+                                                   chunk_size=args.chunk_size):
+            print(f"[{section}] {suggestion}")
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(f"Analyzed in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
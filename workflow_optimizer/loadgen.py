@@ -0,0 +1,127 @@
+"""
+Load generator for the HTTP API (workflow_optimizer.server).
+
+Opens --concurrency keep-alive connections and sends --requests analyze
+calls built from the sample workflows, then reports latency percentiles
+(of successful requests) and requests/sec:
+
+    python -m workflow_optimizer.loadgen --port 8080 --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+
+from .samples import SAMPLE_INPUTS
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_payload(index, batch_size):
+    """Request body for the index-th request (unique text so results aren't trivially reused)"""
+    samples = list(SAMPLE_INPUTS.values())
+    items = [
+        {"text": f"{samples[(index + offset) % len(samples)]} (request {index}.{offset})"}
+        for offset in range(batch_size)
+    ]
+    if batch_size == 1:
+        return "/analyze", items[0]
+    return "/analyze/batch", {"items": items}
+
+
+async def read_response(reader):
+    """Read one HTTP response and return (status, body bytes)"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    return status, await reader.readexactly(length)
+
+
+async def worker(host, port, counter, total, batch_size, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            index = next(counter)
+            if index >= total:
+                return
+            path, payload = build_payload(index, batch_size)
+            body = json.dumps(payload).encode()
+            request = (
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+            ).encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _ = await read_response(reader)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host="127.0.0.1", port=8080, concurrency=16, requests=1000, batch_size=1):
+    """Drive the server and return a summary dict"""
+    counter = iter(range(requests + concurrency))
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(host, port, counter, requests, batch_size, latencies, statuses)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()  # successful requests only; rejections are counted in statuses
+    sent = sum(statuses.values())
+    return {
+        "requests": sent,
+        "ok": len(latencies),
+        "items": len(latencies) * batch_size,
+        "seconds": elapsed,
+        "requests_per_sec": sent / elapsed if elapsed else 0.0,
+        "ok_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "statuses": statuses
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.loadgen",
+        description="Generate load against the workflow analysis HTTP API."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="parallel keep-alive connections (default: 16)")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="total requests to send (default: 1000)")
+    parser.add_argument("--batch-size", type=int, default=1, help="items per request; >1 uses /analyze/batch (default: 1)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load(args.host, args.port, args.concurrency, args.requests, args.batch_size))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{summary['requests']} requests in {summary['seconds']:.2f}s: {summary['requests_per_sec']:.1f} req/s, "
+          f"{summary['ok_per_sec']:.1f} successful req/s ({summary['items']} items analyzed)")
+    print(f"successful latency p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms")
+    print("status codes: " + ", ".join(f"{status} x{count}" for status, count in sorted(summary["statuses"].items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Keyword matching over the classification rule tables.
+"""
+import re
+from collections import Counter
+
+# Words are runs of letters; multi-word keywords may be separated by spaces
+# or hyphens ("time-consuming" is the phrase "time consuming")
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+NUMBER_PATTERN = re.compile(r"\d+")
+PHRASE_SEPARATOR = r"[\s-]+"
+
+# Common plural and verb endings stripped when looking a word up
+# (ending, replacement), tried in order
+WORD_ENDINGS = [
+    ("ies", "y"), ("es", ""), ("s", ""),
+    ("ing", ""), ("ing", "e"), ("ed", ""), ("ed", "e"), ("d", ""),
+    ("ers", ""), ("ers", "e"), ("er", ""), ("er", "e")
+]
+
+# Distinct tokens remembered by a matcher before its lookup cache is reset
+TOKEN_CACHE_SIZE = 100000
+
+
+def word_forms(word):
+    """Return the word plus the base forms it may be an inflection of"""
+    forms = [word]
+    for ending, replacement in WORD_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            stem = word[:-len(ending)]
+            forms.append(stem + replacement)
+            # "scanned" -> "scann" -> "scan"
+            if not replacement and len(stem) > 2 and stem[-1] == stem[-2]:
+                forms.append(stem[:-1])
+    return forms
+
+
+class KeywordMatcher:
+    """
+    Matcher over all keyword tables at once.
+
+    Instead of scanning the text once per keyword, the text is split into
+    whitespace tokens and counted in a single pass (both done in C), and each
+    distinct token is resolved through one hash index mapping words to every
+    (table, category, keyword) they belong to. Token lookups are cached, so
+    repeated words cost a dict hit. Multi-word keywords are confirmed with a
+    targeted search only when their first word occurs in the text.
+
+    Keywords match whole words, allowing common plural/verb endings on the
+    last word ("reports" matches "report", but "three" does not match "hr").
+    Keywords written in upper case, like "IT", are acronyms and only match
+    the same upper-case word in the original text.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.index = {}        # word tuple -> [(table, category, keyword), ...]
+        self.acronyms = {}     # exact word -> [(table, category, keyword), ...]
+        self.phrases = {}      # first word -> [(pattern, last word, entries), ...]
+        self.token_cache = {}  # token -> (entries, numbers, phrase first words)
+
+        for table, categories in tables.items():
+            for category, keywords in categories.items():
+                for keyword in keywords:
+                    entry = (table, category, keyword)
+                    if keyword.isupper():
+                        self.acronyms.setdefault(keyword, []).append(entry)
+                        continue
+                    words = tuple(WORD_PATTERN.findall(keyword.lower()))
+                    self.index.setdefault(words, []).append(entry)
+
+        for words, entries in self.index.items():
+            if len(words) > 1:
+                # Leading words verbatim, then a word starting like the last
+                # one (inflections may drop a final e/y; checked in scan)
+                last = words[-1][:-1] if words[-1][-1] in "ey" else words[-1]
+                head = PHRASE_SEPARATOR.join(re.escape(word) for word in words[:-1])
+                pattern = re.compile(head + PHRASE_SEPARATOR + "(" + re.escape(last) + r"[^\W\d_]*)")
+                self.phrases.setdefault(words[0], []).append((pattern, words[-1], entries))
+
+    def token_info(self, token):
+        """
+        Return (entries, numbers, phrase first words) for one whitespace token.
+
+        The cache is only touched with single dict operations, so a matcher
+        can be shared by concurrent sessions.
+        """
+        info = self.token_cache.get(token)
+        if info is None:
+            entries = []
+            heads = []
+            for word in WORD_PATTERN.findall(token):
+                entries.extend(self.acronyms.get(word, ()))
+                word = word.lower()
+                for form in word_forms(word):
+                    entries.extend(self.index.get((form,), ()))
+                if word in self.phrases:
+                    heads.append(word)
+            info = (entries, NUMBER_PATTERN.findall(token), heads)
+            if len(self.token_cache) >= TOKEN_CACHE_SIZE:
+                self.token_cache.clear()
+            self.token_cache[token] = info
+        return info
+
+    def match(self, text):
+        """
+        Return (entries, numbers) for the text.
+
+        entries is the set of (table, category, keyword) entries found;
+        numbers lists every digit run in the text (grouped by token).
+        """
+        found = set()
+        numbers = []
+        heads = set()
+
+        for token, count in Counter(text.split()).items():
+            entries, token_numbers, token_heads = self.token_info(token)
+            found.update(entries)
+            if token_numbers:
+                numbers.extend(token_numbers * count)
+            heads.update(token_heads)
+
+        if heads:
+            found.update(self.match_phrases(text, heads))
+
+        return found, numbers
+
+    def match_phrases(self, text, heads):
+        """Return the entries of multi-word keywords starting with one of heads that occur in text"""
+        found = set()
+        lowered = text.lower()
+        for head in heads:
+            for pattern, last, entries in self.phrases[head]:
+                if any(self.is_phrase(lowered, match, last) for match in pattern.finditer(lowered)):
+                    found.update(entries)
+        return found
+
+    def scan(self, text):
+        """
+        Match every table against the text and return (hits, numbers).
+
+        hits maps table -> category -> set of keywords found;
+        numbers is as in match.
+        """
+        entries, numbers = self.match(text)
+        return self.group(entries), numbers
+
+    def group(self, entries):
+        """Arrange (table, category, keyword) entries as table -> category -> set of keywords"""
+        hits = {table: {} for table in self.tables}
+        for table, category, keyword in entries:
+            hits[table].setdefault(category, set()).add(keyword)
+        return hits
+
+    @staticmethod
+    def is_phrase(text, match, last):
+        """Check a phrase match starts on a word boundary and ends in a form of last"""
+        start = match.start()
+        if start and (text[start - 1].isalpha() or text[start - 1] == "_"):
+            return False
+        return last in word_forms(match.group(1))
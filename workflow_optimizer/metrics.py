@@ -0,0 +1,172 @@
+"""
+Lightweight, toggleable instrumentation.
+
+The engine and the UI record into the process-wide METRICS registry, but
+only while it is enabled (set WORKFLOW_METRICS=1, or call METRICS.enable()).
+When disabled every recording site is a single attribute check, so the hot
+path costs nothing measurable.
+
+Recorded metrics:
+    workflow_stage_seconds{stage}          histogram, time from a stage's start to the next one
+    workflow_analysis_seconds              histogram, whole pipeline
+    workflow_analyses_total{workflow}      counter, by primary workflow type
+    workflow_pain_points_total{pain}       counter, every pain point that fired
+    workflow_request_seconds{outcome}      histogram, UI analyze requests
+
+MetricsExporter writes the registry to a local file in Prometheus text
+format or as JSON snapshots every few seconds. Each process has its own
+registry; process pool workers are not included in the parent's export.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Return [(upper bound, count of observations <= bound)], ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def format_labels(labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}" if labels else ""
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """Return the current values as a JSON-serializable dict"""
+        with self.lock:
+            return {
+                "timestamp": time.time(),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": [[bound if bound != float("inf") else "+Inf", count] for bound, count in histogram.cumulative()]
+                    }
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ]
+            }
+
+    def prometheus(self):
+        """Return the current values in the Prometheus text exposition format"""
+        lines = []
+        typed = set()
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, fmt="prometheus"):
+        """Atomically replace path with the current values ("prometheus" or "json")"""
+        text = self.prometheus() if fmt == "prometheus" else json.dumps(self.snapshot(), indent=2)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+
+# Shared by the engine and the UI of this process
+METRICS = Metrics(enabled=os.environ.get("WORKFLOW_METRICS", "") not in ("", "0"))
+
+
+class MetricsExporter:
+    """
+    Background thread that writes a registry to a file every interval seconds.
+
+    The format is "prometheus" (e.g. for the node exporter's textfile
+    collector) or "json". A final write happens on close().
+    """
+
+    def __init__(self, path, fmt="prometheus", interval=10.0, metrics=METRICS):
+        if fmt not in ("prometheus", "json"):
+            raise ValueError(f"unknown metrics format {fmt!r}; choose prometheus or json")
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self.metrics = metrics
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.write(self.path, self.fmt)
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.metrics.write(self.path, self.fmt)
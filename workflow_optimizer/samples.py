@@ -0,0 +1,10 @@
+"""
+Sample workflow descriptions offered in the UI.
+"""
+
+# Sample input templates
+SAMPLE_INPUTS = {
+    "Email & Report Processing": "Every day I need to collect customer feedback from our support email, categorize the issues (bug, feature request, complaint, or praise), count how many of each type we received, manually enter this data into a spreadsheet, create charts to visualize trends, and then draft a summary report that I email to the management team. I spend about 3 hours on this process daily, and it's very repetitive.",
+    "Data Entry Task": "I receive PDF invoices from suppliers via email. For each invoice, I open it, read the invoice number, date, amount, and vendor details, then manually enter these into our accounting system. I also need to categorize each expense and attach the PDF to the entry. I process about 50 invoices every day and it takes most of my workday.",
+    "Customer Support Procedure": "When customers call with technical issues, I gather their account details, look up their purchase history in one system, check their service status in another system, document the issue in our ticketing software, and then walk through a standard troubleshooting script. If this doesn't resolve their problem, I create a ticket for our technical team and provide the customer with a reference number. Each call takes about 15 minutes."
+}
@@ -0,0 +1,244 @@
+"""
+Asyncio HTTP API for the analysis engine.
+
+Runs alongside (or instead of) the Streamlit app:
+
+    python -m workflow_optimizer.server --port 8080
+
+Endpoints:
+    GET  /health           {"status": "ok", "pending": <queued items>}
+    POST /analyze          {"text": ..., "creativity_level": 0.7, "response_length": null}
+                           -> {"automation": ..., "efficiency": ..., "fun": ...}
+    POST /analyze/batch    {"items": [<analyze payload>, ...]} -> {"results": [...]}
+
+Connections are kept alive (HTTP/1.1). Analysis runs on a bounded process
+or thread pool; once more than --max-queue items are waiting, requests are
+rejected with 429 and a Retry-After header instead of piling up. A batch
+of more than --max-batch items (at most --max-queue) could never be
+accepted, so it is rejected with 413 instead. Request bodies need a
+Content-Length; chunked bodies get 411 and the connection is closed.
+Idle connections, and request bodies that don't arrive in full, time out
+after the keep-alive timeout (a slow body gets 408).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .engine import generate_response
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error"
+}
+
+
+class RequestError(Exception):
+    """A client error reported to the caller as an HTTP status and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_item(payload):
+    """Validate one analyze payload and return (text, creativity_level, response_length)"""
+    if not isinstance(payload, dict):
+        raise RequestError(400, "each item must be a JSON object")
+    text = payload.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise RequestError(400, "text must be a non-empty string")
+    creativity_level = payload.get("creativity_level", 0.7)
+    response_length = payload.get("response_length")
+    # bool is an int subclass, but true/false are not numbers here
+    if isinstance(creativity_level, bool) or not isinstance(creativity_level, (int, float)) or not 0 <= creativity_level <= 1:
+        raise RequestError(400, "creativity_level must be a number between 0 and 1")
+    if response_length is not None and (isinstance(response_length, bool) or not isinstance(response_length, int)
+                                        or response_length <= 0):
+        raise RequestError(400, "response_length must be a positive integer")
+    return text, creativity_level, response_length
+
+
+def analyze_items(items):
+    """Analyze (text, creativity_level, response_length) tuples; module-level so process pools can pickle it"""
+    return [generate_response(text, creativity_level, response_length) for text, creativity_level, response_length in items]
+
+
+class AnalysisServer:
+    """HTTP/1.1 keep-alive server that offloads analyses to an executor"""
+
+    def __init__(self, executor, max_queue=256, keep_alive_timeout=15, max_batch=None):
+        self.executor = executor
+        self.max_queue = max_queue
+        # Larger batches would wait for a queue that can never hold them
+        self.max_batch = min(max_batch or max_queue, max_queue)
+        self.keep_alive_timeout = keep_alive_timeout
+        self.pending = 0  # items submitted to the executor and not yet finished
+        self.rejected = 0
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keep_alive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, 413, {"error": "headers too large"}, keep_alive=False)
+                    break
+
+                method, path, version, headers = self.parse_head(head)
+                keep_alive = self.wants_keep_alive(version, headers)
+                if "transfer-encoding" in headers:
+                    # The body can't be skipped without decoding it, so the
+                    # connection can't be reused either
+                    await self.send(writer, 411, {"error": "send the body with a Content-Length"}, keep_alive=False)
+                    break
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self.send(writer, 413, {"error": "body too large or invalid Content-Length"}, keep_alive=False)
+                    break
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), self.keep_alive_timeout) if length else b""
+                except asyncio.TimeoutError:
+                    await self.send(writer, 408, {"error": "request body not received in time"}, keep_alive=False)
+                    break
+
+                try:
+                    status, payload, extra_headers = 200, await self.route(method, path, body), {}
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    extra_headers = {"Retry-After": "1"} if e.status == 429 else {}
+                except Exception as e:
+                    status, payload, extra_headers = 500, {"error": f"{type(e).__name__}: {e}"}, {}
+
+                await self.send(writer, status, payload, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def parse_head(head):
+        """Split a raw request head into (method, path, version, lowercased headers)"""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, version = lines[0].split(" ", 2)
+        except ValueError:
+            method, path, version = "", "", "HTTP/1.0"
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        return method, path.split("?", 1)[0], version, headers
+
+    @staticmethod
+    def wants_keep_alive(version, headers):
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def route(self, method, path, body):
+        if path == "/health":
+            if method != "GET":
+                raise RequestError(405, "use GET")
+            return {"status": "ok", "pending": self.pending, "rejected": self.rejected}
+
+        if path not in ("/analyze", "/analyze/batch"):
+            raise RequestError(404, f"no route for {path}")
+        if method != "POST":
+            raise RequestError(405, "use POST")
+
+        try:
+            payload = json.loads(body or b"null")
+        except json.JSONDecodeError as e:
+            raise RequestError(400, f"invalid JSON: {e}") from None
+
+        if path == "/analyze":
+            return (await self.analyze([parse_item(payload)]))[0]
+
+        items = payload.get("items") if isinstance(payload, dict) else None
+        if not isinstance(items, list) or not items:
+            raise RequestError(400, "items must be a non-empty list")
+        if len(items) > self.max_batch:
+            raise RequestError(413, f"batch of {len(items)} items exceeds the limit of {self.max_batch}")
+        return {"results": await self.analyze([parse_item(item) for item in items])}
+
+    async def analyze(self, items):
+        """Run items on the executor, or reject them if the queue is full"""
+        if self.pending + len(items) > self.max_queue:
+            self.rejected += 1
+            raise RequestError(429, f"server busy ({self.pending} items queued)")
+        self.pending += len(items)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, analyze_items, items)
+        finally:
+            self.pending -= len(items)
+
+    async def send(self, writer, status, payload, keep_alive, extra_headers=None):
+        body = json.dumps(payload).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close"
+        }
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8080, workers=None, executor="process", max_queue=256, max_batch=None):
+    """Run the API server until cancelled"""
+    workers = workers or os.cpu_count() or 1
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        app = AnalysisServer(pool, max_queue=max_queue, max_batch=max_batch)
+        server = await asyncio.start_server(app.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        print(f"Serving on http://{host}:{port} ({workers} {executor} workers, max queue {max_queue}, "
+              f"max batch {app.max_batch})", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.server",
+        description="Serve the workflow analysis engine over HTTP."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument("-j", "--workers", type=int, help="executor size (default: CPU count)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process", help="executor type (default: process)")
+    parser.add_argument("--max-queue", type=int, default=256, help="items allowed in flight before returning 429 (default: 256)")
+    parser.add_argument("--max-batch", type=int, help="items allowed in one batch request, else 413 (default: --max-queue)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.executor, args.max_queue, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Session load test for the Streamlit UI (app.py), built on Streamlit's AppTest.
+
+Simulates --sessions independent sessions, --concurrency at once. Each
+one opens the app, picks a sample workflow, clicks Analyze and then moves
+the Creativity slider --changes times. Reports the wall time of each kind
+of rerun, the CPU time the sessions' scripts used, and how often the
+suggestions were still shown after a slider move. Run it against two
+versions of the app to compare them:
+
+    git show HEAD~1:app.py > app_before.py
+    python -m workflow_optimizer.uiload --app app_before.py
+    python -m workflow_optimizer.uiload --app app.py
+
+Sessions run in worker processes, like the workers of a multi-process
+deployment: each has its own st.cache_resource objects. AppTest instances
+on threads of one process share Streamlit's runtime state and fail at
+random (lost session state keys, and on Python 3.11 SyntaxError or
+SystemError from concurrent compiles of the script).
+
+AppTest (as of Streamlit 1.65) runs the whole script for an interaction
+inside a fragment, so the slider timings are an upper bound for what a
+browser session sees. Needs streamlit installed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from streamlit.testing.v1 import AppTest
+except ImportError:
+    AppTest = None
+
+from .loadgen import percentile
+
+# Sample picked by every session
+SAMPLE = "Data Entry Task"
+
+# Marker of a rendered results panel
+RESULT_HEADING = "Automation Opportunities"
+
+
+def find(app, element_type, label):
+    """The first widget of element_type whose label starts with label"""
+    for widget in app.get(element_type):
+        if widget.label.startswith(label):
+            return widget
+    raise LookupError(f"no {element_type} labelled {label!r}")
+
+
+def shows_results(app):
+    return any(RESULT_HEADING in element.value for element in app.markdown)
+
+
+def run_session(app_path, changes, timeout):
+    """Drive one session; returns ([(kind, seconds)], slider moves that still showed results, CPU seconds)"""
+    cpu_start = time.process_time()
+    # Running the script replaces __main__, which the worker needs to
+    # unpickle its next call (run_session lives there under python -m)
+    main_module = sys.modules["__main__"]
+    try:
+        steps, shown = drive_session(app_path, changes, timeout)
+    finally:
+        sys.modules["__main__"] = main_module
+    return steps, shown, time.process_time() - cpu_start
+
+
+def drive_session(app_path, changes, timeout):
+    """run_session without the bookkeeping; returns (steps, shown)"""
+    app = AppTest.from_file(app_path, default_timeout=timeout)
+    steps = []
+
+    def timed(kind, action):
+        start = time.perf_counter()
+        action()
+        steps.append((kind, time.perf_counter() - start))
+
+    timed("load", app.run)
+    timed("sample", lambda: find(app, "selectbox", "Choose a sample").set_value(SAMPLE).run())
+    timed("analyze", lambda: find(app, "button", "🔍 Analyze").click().run())
+    shown = 0
+    for change in range(changes):
+        value = round(0.1 + (change % 10) / 10, 1)
+        timed("creativity", lambda: find(app, "slider", "Creativity").set_value(value).run())
+        shown += shows_results(app)
+    if app.exception:
+        raise RuntimeError(f"app raised: {app.exception[0].value}")
+    return steps, shown
+
+
+def run_load(app_path="app.py", sessions=20, concurrency=4, changes=5, timeout=60.0):
+    """Run the sessions and return the summary dict"""
+    timings = {}
+    shown = 0
+    cpu = 0.0
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        for steps, session_shown, session_cpu in pool.map(
+            run_session, [app_path] * sessions, [changes] * sessions, [timeout] * sessions
+        ):
+            for kind, seconds in steps:
+                timings.setdefault(kind, []).append(seconds)
+            shown += session_shown
+            cpu += session_cpu
+    wall = time.perf_counter() - wall_start
+
+    reruns = {}
+    for kind, values in timings.items():
+        values.sort()
+        reruns[kind] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "max_ms": values[-1] * 1000
+        }
+    return {
+        "app": app_path,
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_per_session_ms": cpu / sessions * 1000,
+        "results_kept": shown / (sessions * changes) if changes else None,
+        "reruns": reruns
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m workflow_optimizer.uiload",
+        description="Simulate concurrent Streamlit sessions of the UI and report rerun cost."
+    )
+    parser.add_argument("--app", default="app.py", help="app script to test (default: app.py)")
+    parser.add_argument("-n", "--sessions", type=int, default=20, help="sessions to simulate (default: 20)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="sessions run at once (default: 4)")
+    parser.add_argument("--changes", type=int, default=5, help="creativity changes per session (default: 5)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per rerun (default: 60)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+    if AppTest is None:
+        parser.exit(1, "error: the load test needs streamlit (pip install streamlit)\n")
+
+    summary = run_load(os.path.abspath(args.app), args.sessions, args.concurrency, args.changes, args.timeout)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{summary['sessions']} sessions ({summary['concurrency']} at once) of {summary['app']}: "
+          f"{summary['wall_s']:.2f}s wall, {summary['cpu_s']:.2f}s CPU "
+          f"({summary['cpu_per_session_ms']:.0f} ms per session)")
+    for kind, stats in summary["reruns"].items():
+        print(f"  {kind:10s} p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  (n={stats['count']})")
+    if summary["results_kept"] is not None:
+        print(f"suggestions still shown after a creativity change: {summary['results_kept']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Vectorized feature extraction for large batches.
+
+extract_features_batch splits a batch of descriptions into whitespace
+tokens once, resolves each distinct token of the batch through the shared
+KeywordMatcher a single time, and builds a sparse keyword incidence matrix
+(one row per text, one column per (table, category, keyword) in the rule
+tables) with NumPy. Workflow scores, the primary type and the tool,
+frequency and pain point flags for the whole batch are then computed from
+that matrix. The features are identical to what extract_features returns
+for each text.
+
+NumPy is optional: without it extract_features_batch falls back to calling
+extract_features per text.
+"""
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .engine import (
+    DEFAULT_PAIN_POINTS, METRICS,
+    estimate_volume, extract_features, fingerprint_words, keyword_matcher, record_feature_metrics
+)
+
+# Texts processed per matrix, to bound the memory held by token arrays
+BATCH_ROWS = 4096
+
+
+def expand_ranges(starts, lengths):
+    """Concatenate range(start, start + length) for every pair, without a Python loop"""
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+class KeywordMatrix:
+    """Keyword vocabulary of a KeywordMatcher, laid out as matrix columns"""
+
+    def __init__(self, matcher=None):
+        matcher = matcher or keyword_matcher()
+        self.matcher = matcher
+        self.columns = {}     # (table, category, keyword) -> column
+        self.categories = {}  # table -> [category, ...] in rule table order
+        column_tables = []    # column -> (table, category index)
+        for table, categories in matcher.tables.items():
+            self.categories[table] = list(categories)
+            for category_index, (category, keywords) in enumerate(categories.items()):
+                for keyword in keywords:
+                    entry = (table, category, keyword)
+                    if entry not in self.columns:
+                        self.columns[entry] = len(self.columns)
+                        column_tables.append((table, category_index))
+
+        # Per table: the category index of every column, or -1 for columns
+        # from other tables
+        self.column_category = {}
+        for table in self.categories:
+            self.column_category[table] = np.array(
+                [index if column_table == table else -1 for column_table, index in column_tables],
+                dtype=np.int64
+            )
+
+    def token_table(self, tokens):
+        """
+        Resolve distinct tokens through the matcher.
+
+        Returns the keyword columns of every token as CSR pointers and
+        indices, the sum and count of the reasonable numbers in each token,
+        and the phrase heads per token.
+        """
+        pointers = [0]
+        indices = []
+        number_sums = []
+        number_counts = []
+        heads = []
+        lookup = self.columns
+        for token in tokens:
+            entries, numbers, token_heads = self.matcher.token_info(token)
+            indices.extend([lookup[entry] for entry in entries])
+            pointers.append(len(indices))
+            # Same filter as estimate_volume
+            reasonable = [int(num) for num in numbers if int(num) < 1000]
+            number_sums.append(sum(reasonable))
+            number_counts.append(len(reasonable))
+            heads.append(token_heads)
+        return (np.array(pointers, dtype=np.int64), np.array(indices, dtype=np.int64),
+                np.array(number_sums, dtype=np.int64), np.array(number_counts, dtype=np.int64), heads)
+
+    def scan(self, texts):
+        """
+        Match texts and return (rows, columns, number sums, number counts, fingerprints).
+
+        rows/columns are the coordinates of the nonzero cells of the
+        len(texts) x len(self.columns) keyword matrix, each cell once.
+        Number sums/counts are per text, over the reasonable numbers in it.
+        """
+        # Term counts as COO triplets: (text, token, occurrences)
+        tokens = []
+        occurrences = []
+        lengths = []
+        fingerprints = []
+        for text in texts:
+            words = text.split()
+            fingerprints.append(fingerprint_words(words))
+            term_counts = Counter(words)
+            tokens += term_counts.keys()
+            occurrences += term_counts.values()
+            lengths.append(len(term_counts))
+
+        distinct = list(set(tokens))
+        vocabulary = dict(zip(distinct, range(len(distinct))))
+        pointers, indices, number_sums, number_counts, heads = self.token_table(distinct)
+
+        token_ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        token_rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        occurrences = np.array(occurrences, dtype=np.int64)
+
+        # Numbers count every occurrence of a token
+        sums = np.bincount(token_rows, weights=occurrences * number_sums[token_ids], minlength=len(texts))
+        counts = np.bincount(token_rows, weights=occurrences * number_counts[token_ids], minlength=len(texts))
+
+        # Keywords only need each token once per text
+        widths = pointers[token_ids + 1] - pointers[token_ids]
+        rows = np.repeat(token_rows, widths)
+        columns = indices[expand_ranges(pointers[token_ids], widths)]
+
+        # Multi-word keywords are confirmed per text, only where a first word occurs
+        phrase_rows = {}
+        has_heads = np.fromiter(map(bool, heads), dtype=bool, count=len(heads))
+        with_heads = has_heads[token_ids]
+        for row, token in zip(token_rows[with_heads].tolist(), token_ids[with_heads].tolist()):
+            phrase_rows.setdefault(row, set()).update(heads[token])
+        extra_rows = []
+        extra_columns = []
+        for row, row_heads in phrase_rows.items():
+            for entry in self.matcher.match_phrases(texts[row], row_heads):
+                extra_rows.append(row)
+                extra_columns.append(self.columns[entry])
+        if extra_rows:
+            rows = np.concatenate([rows, np.array(extra_rows, dtype=np.int64)])
+            columns = np.concatenate([columns, np.array(extra_columns, dtype=np.int64)])
+
+        # Different tokens can hit the same keyword ("report", "reports")
+        cells = np.unique(rows * len(self.columns) + columns)
+        rows, columns = np.divmod(cells, len(self.columns))
+        return rows, columns, sums.astype(np.int64), counts.astype(np.int64), fingerprints
+
+    def category_counts(self, table, rows, columns, count):
+        """count x categories matrix of distinct keywords found per category of table"""
+        categories = self.column_category[table][columns]
+        inside = categories >= 0
+        width = len(self.categories[table])
+        cells = rows[inside] * width + categories[inside]
+        return np.bincount(cells, minlength=count * width).reshape(count, width)
+
+
+def first_flagged(flags):
+    """Index of the first true column in each row, or -1 where none is"""
+    return np.where(flags.any(axis=1), flags.argmax(axis=1), -1)
+
+
+def flagged_names(flags, names):
+    """Per row, the names whose column is true, in column order"""
+    return [[names[index] for index in row.nonzero()[0]] for row in flags]
+
+
+_matrix = None
+
+
+def keyword_matrix():
+    """The KeywordMatrix for the engine's matcher, built on first use and after a catalog reload"""
+    global _matrix
+    matcher = keyword_matcher()
+    if _matrix is None or _matrix.matcher is not matcher:
+        _matrix = KeywordMatrix(matcher)
+    return _matrix
+
+
+def extract_features_batch(texts):
+    """Return extract_features(text) for every text, computed in batches"""
+    texts = list(texts)
+    if np is None:
+        return [extract_features(text) for text in texts]
+    results = []
+    for start in range(0, len(texts), BATCH_ROWS):
+        results.extend(features_for_rows(keyword_matrix(), texts[start:start + BATCH_ROWS]))
+    return results
+
+
+def features_for_rows(matrix, texts):
+    count = len(texts)
+    rows, columns, number_sums, number_counts, fingerprints = matrix.scan(texts)
+
+    # Workflow type scores and argmax (first maximum wins, like max())
+    workflow_types = matrix.categories["workflow_types"]
+    scores = matrix.category_counts("workflow_types", rows, columns, count)
+    primary = np.where(scores.any(axis=1), scores.argmax(axis=1), -1).tolist()
+
+    tools = flagged_names(matrix.category_counts("tools", rows, columns, count) > 0, matrix.categories["tools"])
+    frequency = first_flagged(matrix.category_counts("time_indicators", rows, columns, count) > 0).tolist()
+    pains = flagged_names(matrix.category_counts("pain_indicators", rows, columns, count) > 0,
+                          matrix.categories["pain_indicators"])
+
+    time_indicators = matrix.categories["time_indicators"]
+    number_sums = number_sums.tolist()
+    number_counts = number_counts.tolist()
+    results = []
+    for index, (fingerprint, row_scores) in enumerate(zip(fingerprints, scores.tolist())):
+        features = {
+            "fingerprint": fingerprint,
+            "workflow_scores": dict(zip(workflow_types, row_scores)),
+            "primary_workflow": workflow_types[primary[index]] if primary[index] >= 0 else "general",
+            "tools": tools[index],
+            "frequency": time_indicators[frequency[index]] if frequency[index] >= 0 else "unknown",
+            "volume": number_sums[index] if number_counts[index] else estimate_volume((), fingerprint),
+            "pain_points": pains[index] or list(DEFAULT_PAIN_POINTS)
+        }
+        if METRICS.enabled:
+            record_feature_metrics(features)
+        results.append(features)
+    return results